@@ -0,0 +1,98 @@
+import json
+
+from journal import Journal, journal_path_for
+from pipeline import apply_records, load_profile, make_record
+
+
+def custom_id_for(profile, row):
+    return f"{profile['name']}-row-{int(row)}"
+
+
+def parse_custom_id(custom_id):
+    name, row = custom_id.rsplit("-row-", 1)
+    return name, int(row)
+
+
+def export_batch(profiles, engine, batch_path, url="/v1/chat/completions", compactor=None):
+    """Writes one Batch API request per row, rendered exactly like the online requests (bodies shrunk
+    by `compactor` when given)."""
+    count = 0
+    with open(batch_path, "w", encoding="utf-8") as f:
+        for profile in profiles:
+            df = load_profile(profile)
+            for i, row in df.iterrows():
+                if compactor is not None:
+                    row, _ = compactor(row)
+                line = {
+                    "custom_id": custom_id_for(profile, i),
+                    "method": "POST",
+                    "url": url,
+                    "body": engine.build_request(profile["build_content"](row), system_role=profile["system_role"]),
+                }
+                f.write(json.dumps(line, ensure_ascii=False) + "\n")
+                count += 1
+    print(f"已导出 {count} 条批处理请求到 {batch_path}")
+
+
+def usage_from_json(usage):
+    if not usage:
+        return None
+    return {
+        "prompt_tokens": usage.get("prompt_tokens"),
+        "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0,
+        "completion_tokens": usage.get("completion_tokens"),
+    }
+
+
+def read_batch_output(batch_output_path):
+    """Returns {profile name: {row: record}} parsed from a completed batch output file."""
+    records = {}
+    with open(batch_output_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            name, row = parse_custom_id(item["custom_id"])
+            response = item.get("response") or {}
+            error = item.get("error")
+            text = None
+            responses = None
+            usage = None
+            if response.get("status_code") == 200:
+                body = response["body"]
+                # refusals and tool calls come back with null content
+                responses = [(choice["message"]["content"] or "").strip() for choice in body["choices"]]
+                text = responses[0]
+                usage = usage_from_json(body.get("usage"))
+            elif error is None:
+                error = f"status {response.get('status_code')}: {response.get('body')}"
+            if error is not None and not isinstance(error, str):
+                error = f"{error.get('code')}: {error.get('message')}"
+            outcome = {"response": text, "responses": responses if responses and len(responses) > 1 else None,
+                       "error": error, "usage": usage}
+            records.setdefault(name, {})[row] = make_record(row, outcome)
+    return records
+
+
+def ingest_batch(profiles, batch_output_path):
+    """Merges a completed batch output file into each profile's journal and output workbook."""
+    records = read_batch_output(batch_output_path)
+    for profile in profiles:
+        df = load_profile(profile)
+        profile_records = records.get(profile["name"], {})
+        missing = [int(i) for i in df.index if int(i) not in profile_records]
+        if missing:
+            print(f"{profile['name']}: 批处理结果缺少 {len(missing)} 行: {missing[:10]}")
+
+        output_file_path = profile["output_file_path"]
+        journal = Journal(journal_path_for(output_file_path))
+        done = journal.load()
+        try:
+            for row, record in profile_records.items():
+                journal.append(record)
+                done[row] = record
+        finally:
+            journal.close()
+
+        apply_records(df, done)
+        df.to_excel(output_file_path, index=False)
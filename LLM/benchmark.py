@@ -0,0 +1,73 @@
+import argparse
+import json
+import os
+import tempfile
+
+import pandas as pd
+from openai import AsyncOpenAI
+
+from engine import AsyncEngine
+from mock_server import MockSettings, start_mock_server
+from pipeline import classify_dataframe, metrics_path_for
+from ratelimit import RateLimiter
+from retry import RetryPolicy
+
+
+def synthetic_rows(count, body_words=300):
+    body = " ".join(["TVMError: Check failed: (value != nullptr) is false"] * (body_words // 8))
+    return pd.DataFrame({"Title": [f"[Bug] synthetic report {i}" for i in range(count)],
+                         "Body": [f"{body} #{i}" for i in range(count)]})
+
+
+def build_content(row):
+    return f"# - **Title**: {row['Title']}\n# - **Description**: {row['Body']}"
+
+
+def run_level(base_url, df, concurrency, workdir):
+    client = AsyncOpenAI(base_url=base_url, api_key="mock", max_retries=0)
+    engine = AsyncEngine(client, "You are an expert of TVM (a deep learning compiler).", concurrency=concurrency,
+                         retry_policy=RetryPolicy(base_delay=0.2, max_delay=5.0),
+                         rate_limiter=RateLimiter(default_rpm=100000, default_tpm=100000000))
+    output_file_path = os.path.join(workdir, f"bench_c{concurrency}.xlsx")
+    classify_dataframe(df.copy(), build_content, engine, output_file_path)
+    with open(metrics_path_for(output_file_path), encoding="utf-8") as f:
+        summary = json.load(f)
+    return {
+        "concurrency": concurrency,
+        "rows": summary["rows"],
+        "rows_per_s": round(summary["rows_per_s"], 2),
+        **{k: round(v, 3) if v is not None else None for k, v in summary["latency_s"].items()},
+        "retries": summary["retries"],
+        "failures": summary["failures"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmark against the local mock endpoint.")
+    parser.add_argument("--rows", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="write the results table as JSON")
+    args = parser.parse_args()
+
+    settings = MockSettings(args.latency, args.sigma, args.error_rate, args.rate_limit_rate, retry_after=0.2,
+                            seed=0)
+    server = start_mock_server(settings)
+    df = synthetic_rows(args.rows)
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            results = [run_level(server.base_url, df, level, workdir) for level in args.concurrency]
+    finally:
+        server.shutdown()
+
+    print(pd.DataFrame(results).to_string(index=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import sqlite3
+import time
+
+
+class ResponseCache:
+    """On-disk LLM response cache keyed by a hash of the full request, evicting least recently used entries."""
+
+    def __init__(self, path, max_bytes=512 * 1024 * 1024, read_only=False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if read_only:
+            self.conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        else:
+            self.conn = sqlite3.connect(path)
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT, size INTEGER, last_access REAL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_access)")
+            self.conn.commit()
+        self._size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def key(request):
+        payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key, count=True):
+        """The cached response or None; with count=False the caller tallies the lookup via count()."""
+        row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if count:
+            self.count(row is not None)
+        if row is None:
+            return None
+        if not self.read_only:
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.conn.commit()
+        return row[0]
+
+    def count(self, hit):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def put(self, key, response):
+        if self.read_only or response is None:
+            return
+        size = len(response.encode("utf-8"))
+        old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+            (key, response, size, time.time()),
+        )
+        self._size += size - (old[0] if old else 0)
+        if self._size > self.max_bytes:
+            self._evict()
+        self.conn.commit()
+
+    def _evict(self):
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall()
+        for key, size in rows:
+            if self._size <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._size -= size
+            self.evictions += 1
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "size_bytes": self._size,
+        }
+
+    def summary(self):
+        s = self.stats()
+        return (f"缓存命中 {s['hits']} 次，未命中 {s['misses']} 次 (命中率 {s['hit_rate']:.1%})，"
+                f"淘汰 {s['evictions']} 条，占用 {s['size_bytes'] / 1024 / 1024:.1f} MB")
+
+    def close(self):
+        self.conn.close()
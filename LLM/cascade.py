@@ -0,0 +1,106 @@
+import glob
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from loader import read_workbook
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import roc_auc_score
+    from sklearn.model_selection import cross_val_predict
+    from sklearn.pipeline import make_pipeline
+except ImportError:
+    make_pipeline = None
+
+DATASET_GLOB = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "dataset", "*.xlsx")
+
+
+def load_training_data(paths):
+    frames = [read_workbook(path, columns=["Title", "Type"]) for path in paths]
+    df = pd.concat(frames, ignore_index=True).dropna()
+    df = df[df["Type"].isin(["FalsePositive", "Confirmed"])].drop_duplicates("Title")
+    return df["Title"].astype(str).tolist(), (df["Type"] == "FalsePositive").astype(int).to_numpy()
+
+
+class LocalClassifier:
+    """CPU-only TF-IDF + logistic regression scoring P(FalsePositive) from a report title.
+
+    Titles seen in training are scored with their out-of-fold prediction, so labelled reports are not
+    judged by a model that memorised them. `auc` is the ROC AUC of those out-of-fold predictions.
+    """
+
+    def __init__(self, model, out_of_fold, auc=None):
+        self.model = model
+        self.out_of_fold = out_of_fold
+        self.auc = auc
+
+    @classmethod
+    def build(cls, titles, labels):
+        if make_pipeline is None:
+            raise ImportError("the local cascade needs scikit-learn (pip install scikit-learn)")
+        model = make_pipeline(TfidfVectorizer(sublinear_tf=True, ngram_range=(1, 2)),
+                              LogisticRegression(max_iter=1000, class_weight="balanced"))
+        oof = cross_val_predict(model, titles, labels, cv=5, method="predict_proba")[:, 1]
+        model.fit(titles, labels)
+        return cls(model, dict(zip(titles, oof)), float(roc_auc_score(labels, oof)))
+
+    @classmethod
+    def load_or_build(cls, path, dataset_paths=None):
+        dataset_paths = sorted(dataset_paths or glob.glob(DATASET_GLOB))
+        titles, labels = load_training_data(dataset_paths)
+        signature = hashlib.sha256(repr((titles, labels.tolist())).encode("utf-8")).hexdigest()
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                saved = pickle.load(f)
+            if saved["signature"] == signature and "auc" in saved:
+                return cls(saved["model"], saved["out_of_fold"], saved["auc"])
+        classifier = cls.build(titles, labels)
+        with open(path, "wb") as f:
+            pickle.dump({"signature": signature, "model": classifier.model,
+                         "out_of_fold": classifier.out_of_fold, "auc": classifier.auc}, f)
+        return classifier
+
+    def predict(self, titles):
+        titles = [str(title) for title in titles]
+        probabilities = self.model.predict_proba(titles)[:, 1]
+        return np.array([self.out_of_fold.get(title, p) for title, p in zip(titles, probabilities)])
+
+
+class Cascade:
+    """Settles confident rows with the local classifier; rows inside [low, high] escalate to the LLM."""
+
+    def __init__(self, classifier, low=0.1, high=0.9):
+        self.classifier = classifier
+        self.low = low
+        self.high = high
+
+    def score(self, rows):
+        return self.classifier.predict([row["Title"] for row in rows])
+
+    def escalate(self, probability):
+        return self.low <= probability <= self.high
+
+    @staticmethod
+    def local_response(probability):
+        return (f"FalsePositive_Probability: {probability:.2f}\n\n"
+                f"Reasoning: Decided by the local title classifier without querying the LLM.")
+
+
+def tier_report(df):
+    """Escalation rate and per-tier accuracy (threshold 0.5) against the Type labels, when present."""
+    if "Tier" not in df.columns:
+        return None
+    report = {"escalation_rate": float((df["Tier"] == "llm").mean())}
+    if "Type" in df.columns:
+        for tier in ("local", "verdict", "llm"):
+            rows = df[(df["Tier"] == tier) & df["FalsePositive_Probability"].notna()]
+            if len(rows):
+                predicted = rows["FalsePositive_Probability"].astype(float) >= 0.5
+                report[f"{tier}_accuracy"] = float((predicted == (rows["Type"] == "FalsePositive")).mean())
+                report[f"{tier}_rows"] = len(rows)
+    return report
@@ -0,0 +1,104 @@
+import re
+
+import pandas as pd
+
+ERROR_LINE = re.compile(r"TVMError|Check failed|RuntimeError|OpConversionFailure|Traceback|Exception|\w*Error\b")
+VOLATILE = re.compile(r"0x[0-9a-fA-F]+|\d+")
+FENCE = re.compile(r"^\s*```")
+
+
+def estimate_tokens(text):
+    return len(text) // 4
+
+
+def _normalized(line):
+    return VOLATILE.sub("#", line.strip())
+
+
+def collapse_repeats(lines, max_period=4):
+    """Collapses runs of a repeated line or block of up to max_period lines (addresses and numbers ignored)."""
+    keys = [_normalized(line) for line in lines]
+    out = []
+    i = 0
+    while i < len(lines):
+        collapsed = False
+        for period in range(1, max_period + 1):
+            block = keys[i:i + period]
+            if len(block) < period:
+                break
+            repeats = 1
+            while keys[i + repeats * period:i + (repeats + 1) * period] == block:
+                repeats += 1
+            if repeats > 2:
+                out.extend(lines[i:i + period])
+                out.append(f"... [previous {period} line(s) repeated {repeats - 1} more times] ...")
+                i += repeats * period
+                collapsed = True
+                break
+        if not collapsed:
+            out.append(lines[i])
+            i += 1
+    return out
+
+
+def _trim(lines, head, tail):
+    """Keeps head and tail lines plus any error lines from the middle."""
+    if len(lines) <= head + tail:
+        return lines
+    middle = lines[head:len(lines) - tail]
+    kept = [line for line in middle if ERROR_LINE.search(line)]
+    omitted = len(middle) - len(kept)
+    return lines[:head] + [f"... [{omitted} lines omitted] ..."] + kept + lines[len(lines) - tail:]
+
+
+def trim_code_blocks(lines, head=15, tail=15):
+    out, block, inside = [], [], False
+    for line in lines:
+        if FENCE.match(line):
+            if inside:
+                out.extend(_trim(block, head, tail))
+                block = []
+            out.append(line)
+            inside = not inside
+        elif inside:
+            block.append(line)
+        else:
+            out.append(line)
+    return out + block
+
+
+def compact_body(text, budget_tokens=2000):
+    """Shrinks a report body towards budget_tokens, keeping error lines; returns (text, compressed/original)."""
+    if not isinstance(text, str) or not text:
+        return text, 1.0
+    original = len(text)
+    lines = collapse_repeats(text.splitlines())
+    if estimate_tokens("\n".join(lines)) > budget_tokens:
+        lines = trim_code_blocks(lines)
+    # last resort: shrink the whole body head-and-tail until it fits
+    keep = 200
+    while estimate_tokens("\n".join(lines)) > budget_tokens and keep >= 5:
+        lines = _trim(lines, keep, keep)
+        keep //= 2
+    compacted = "\n".join(lines)
+    if estimate_tokens(compacted) > budget_tokens:
+        limit = budget_tokens * 4
+        compacted = compacted[:limit // 2] + "\n... [truncated] ...\n" + compacted[-limit // 2:]
+    return compacted, len(compacted) / original
+
+
+class Compactor:
+    """Applies compact_body to a row's Body before its prompt is built."""
+
+    def __init__(self, budget_tokens=2000, column="Body"):
+        self.budget_tokens = budget_tokens
+        self.column = column
+
+    def __call__(self, row):
+        body = row.get(self.column)
+        if body is None or (not isinstance(body, str) and pd.isna(body)):
+            return row, 1.0
+        compacted, ratio = compact_body(body, self.budget_tokens)
+        row = row.copy()
+        row[self.column] = compacted
+        return row, ratio
@@ -0,0 +1,50 @@
+from openai import AsyncOpenAI
+
+from cache import ResponseCache
+from engine import AsyncEngine
+from ratelimit import RateLimiter
+from retry import RetryPolicy
+from router import Endpoint, Router
+
+base_url = ''
+api_key = ''
+
+# further OpenAI-compatible backends served alongside the one above, e.g.
+# {"name": "local-vllm", "base_url": "http://127.0.0.1:8000/v1", "api_key": "EMPTY",
+#  "model": "Qwen2.5-72B-Instruct", "weight": 1.0, "rpm": 1000, "tpm": 1000000}
+# requests are routed by observed latency and error rate; empty keeps the single endpoint
+endpoints = []
+
+concurrency = 16
+cache_path = "llm_response_cache.sqlite"
+cache_max_bytes = 512 * 1024 * 1024
+replay_only = False
+
+async_client = AsyncOpenAI(
+    base_url=base_url,
+    api_key=api_key,
+    max_retries=0
+)
+
+retry_policy = RetryPolicy(max_attempts=6, base_delay=1.0, max_delay=60.0)
+# (requests, tokens) per minute; refined at runtime from x-ratelimit-* headers
+rate_limiter = RateLimiter({"gpt-4o": (500, 30000)})
+
+
+def make_router():
+    if not endpoints:
+        return None
+    routed = [Endpoint("default", async_client, "gpt-4o")]
+    rate_limiter.limits["default"] = rate_limiter.limits["gpt-4o"]
+    for endpoint in endpoints:
+        endpoint_client = AsyncOpenAI(base_url=endpoint["base_url"], api_key=endpoint["api_key"], max_retries=0)
+        routed.append(Endpoint(endpoint["name"], endpoint_client, endpoint["model"], endpoint.get("weight", 1.0)))
+        if "rpm" in endpoint:
+            rate_limiter.limits[endpoint["name"]] = (endpoint["rpm"], endpoint.get("tpm", rate_limiter.default_tpm))
+    return Router(routed)
+
+
+def make_engine(system_role=None):
+    cache = ResponseCache(cache_path, max_bytes=cache_max_bytes, read_only=replay_only)
+    return AsyncEngine(async_client, system_role, concurrency=concurrency, cache=cache,
+                       retry_policy=retry_policy, rate_limiter=rate_limiter, router=make_router())
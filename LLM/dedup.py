@@ -0,0 +1,65 @@
+import re
+import zlib
+
+import numpy as np
+
+PRIME = np.uint64(4294967291)  # largest prime below 2**32, keeps a * x inside uint64
+
+
+def shingles(text, k=3):
+    tokens = re.findall(r"\w+", text.lower())
+    if len(tokens) <= k:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+
+
+def bands_for(num_perm, threshold):
+    """Band count whose LSH S-curve midpoint (1/b)^(1/r) is the highest one not above threshold.
+
+    Keeping the midpoint just below the threshold favours recall; candidates are then checked
+    against the threshold on the full signature.
+    """
+    divisors = [b for b in range(1, num_perm + 1) if num_perm % b == 0]
+    below = [b for b in divisors if (1 / b) ** (b / num_perm) <= threshold]
+    return min(below) if below else num_perm
+
+
+class MinHashLSH:
+    """Clusters near-duplicate texts with MinHash signatures and banded locality-sensitive hashing."""
+
+    def __init__(self, num_perm=128, bands=None, threshold=0.8, seed=1):
+        bands = bands or bands_for(num_perm, threshold)
+        assert num_perm % bands == 0
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, int(PRIME), num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(PRIME), num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+
+    def signature(self, text):
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles(text)), dtype=np.uint64)
+        return ((self.a[:, None] * hashes[None, :] % PRIME + self.b[:, None]) % PRIME).min(axis=1)
+
+    def clusters(self, texts):
+        """Returns, for each text, the position of its cluster representative (the earliest member)."""
+        signatures = [self.signature(text) for text in texts]
+        parent = list(range(len(texts)))
+
+        def find(x):
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for band in range(self.bands):
+            heads = {}
+            lo, hi = band * self.rows, (band + 1) * self.rows
+            for pos, sig in enumerate(signatures):
+                key = sig[lo:hi].tobytes()
+                head = heads.setdefault(key, pos)
+                # compare against the bucket's first member only, so huge buckets stay linear
+                if head != pos and np.mean(signatures[head] == sig) >= self.threshold:
+                    a, b = find(head), find(pos)
+                    parent[max(a, b)] = min(a, b)
+        return [find(pos) for pos in range(len(texts))]
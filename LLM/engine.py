@@ -0,0 +1,278 @@
+import asyncio
+import json
+import time
+
+from retry import RetryPolicy, describe_error, is_retryable, log_retry
+from structured import reask_messages
+
+
+def combine_outcomes(previous, outcome):
+    """Charges an earlier request's attempts, latency and usage for the same row to outcome."""
+    # the earlier request's final attempt was not a retry
+    outcome["attempts"] += previous["attempts"] - 1
+    outcome["latency"] = (outcome["latency"] or 0) + (previous["latency"] or 0)
+    if previous["usage"] and outcome["usage"]:
+        outcome["usage"] = {k: v + previous["usage"][k] for k, v in outcome["usage"].items()}
+    return outcome
+
+
+def usage_of(usage):
+    """Prompt, cached-prefix and completion token counts from a completion's usage field."""
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens,
+        "cached_tokens": getattr(details, "cached_tokens", None) or 0,
+        "completion_tokens": usage.completion_tokens,
+    }
+
+
+class AsyncEngine:
+    """Runs chat completions concurrently on an AsyncOpenAI client, keeping input order."""
+
+    def __init__(self, client, system_role, model="gpt-4o", temperature=0.8, concurrency=16, cache=None,
+                 retry_policy=None, rate_limiter=None, samples=1, response_format=None, validate=None, reask=0, router=None,
+                 stream=False, stop_after=None, probability_end=None):
+        self.client = client
+        self.system_role = system_role
+        self.model = model
+        self.temperature = temperature
+        self.concurrency = concurrency
+        self.cache = cache
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.rate_limiter = rate_limiter
+        self.samples = samples
+        self.response_format = response_format
+        # validate(responses) returns an error string for an unusable answer; such rows are re-asked
+        # up to `reask` times with the error appended to the conversation
+        self.validate = validate
+        self.reask = reask
+        # with a Router, each attempt goes to one of its endpoints instead of `client`
+        self.router = router
+        # streamed completions are closed once every choice has its probability (probability_end(text)
+        # gives the offset just past it) followed by `stop_after` characters of reasoning
+        self.stream = stream
+        self.stop_after = stop_after
+        self.probability_end = probability_end
+        self._semaphore = None
+
+    def build_request(self, content, model=None, system_role=None):
+        request = dict(
+            model=model or self.model,
+            messages=[
+                {"role": "system", "content": system_role or self.system_role},
+                {"role": "user", "content": content}
+            ],
+            temperature=self.temperature
+        )
+        if self.samples > 1:
+            request["n"] = self.samples
+        if self.response_format is not None:
+            request["response_format"] = self.response_format
+        return request
+
+    async def complete(self, content, model=None, system_role=None, validate=None, **overrides):
+        """Returns an outcome dict: response text (or None), failure reason and attempt count.
+
+        With samples > 1, "responses" holds every completion of the single n-sample request.
+        Answers rejected by `validate` are re-asked; "reasks" counts the follow-ups and usage
+        and latency cover all of them, and "invalid" holds the final answer's validation error (or
+        None); `validate` replaces the engine's validator for this call.
+        `overrides` replace request fields (None removes one);
+        with logprobs=True, "top_logprobs" holds the first token's alternatives and no
+        validation, re-ask or streaming applies.
+        """
+        request = self.build_request(content, model, system_role)
+        request.update(overrides)
+        request = {k: v for k, v in request.items() if v is not None}
+        validate = None if "logprobs" in request else validate or self.validate
+        outcome = await self._send(request, validate)
+        outcome["reasks"] = 0
+        outcome["invalid"] = None
+        if "logprobs" in request:
+            return outcome
+        while outcome["response"] is not None and validate is not None:
+            outcome["invalid"] = validate(outcome)
+            if outcome["invalid"] is None or outcome["reasks"] >= self.reask:
+                break
+            request = dict(request, messages=request["messages"] + reask_messages(outcome["response"],
+                                                                                  outcome["invalid"]))
+            retry = combine_outcomes(outcome, await self._send(request, validate))
+            retry["reasks"] = outcome["reasks"] + 1
+            outcome = retry
+        return outcome
+
+    async def _send(self, request, validate=None):
+        """One request through the cache; only answers that pass `validate` are cached or replayed,
+        so rows recorded as invalid are asked again on the next run."""
+        outcome = {"response": None, "responses": None, "error": None, "attempts": 0, "cache_hit": False,
+                   "usage": None, "latency": None, "backend": None, "first_probability": None,
+                   "stopped_early": False, "top_logprobs": None}
+        scoring = "logprobs" in request
+        streaming = self.stream and not scoring
+        stopping = streaming and self.stop_after is not None
+
+        # truncated answers must not be replayed for full-length requests
+        keyed = dict(request, stop_after=self.stop_after) if stopping else request
+        if self.router is None:
+            keys = {None: keyed}
+        else:
+            # routed answers are cached under the backend and model that produced them
+            keys = {endpoint.name: dict(keyed, model=endpoint.model, backend=endpoint.name)
+                    for endpoint in self.router.endpoints}
+        if self.cache is not None:
+            # one lookup per request in the hit/miss stats, however many endpoint keys are tried
+            for backend, keyed_request in keys.items():
+                cached = self.cache.get(self.cache.key(keyed_request), count=False)
+                if cached is None:
+                    continue
+                hit = dict(outcome, cache_hit=True, stopped_early=stopping, backend=backend)
+                if scoring:
+                    hit.update(json.loads(cached))
+                elif "n" in request:
+                    responses = json.loads(cached)
+                    hit.update(response=responses[0], responses=responses)
+                else:
+                    hit.update(response=cached)
+                # caches written before answers were validated may still hold invalid ones
+                # a truncated answer stays marked as stopped early, so it is validated without reasoning
+                if validate is None or validate(hit) is None:
+                    self.cache.count(True)
+                    return hit
+            self.cache.count(False)
+            if self.cache.read_only:
+                outcome["error"] = "not in replay cache"
+                return outcome
+
+        model = request["model"]
+        estimated = 0
+        if self.rate_limiter is not None:
+            estimated = self.rate_limiter.estimate_tokens(request["messages"], request.get("n", 1),
+                                                          request.get("max_tokens"))
+
+        # rate limits are tracked per endpoint when routing, per model otherwise
+        limit = {"key": model}
+
+        async def attempt():
+            endpoint = self.router.pick() if self.router is not None else None
+            client, call = self.client, request
+            if endpoint is not None:
+                client, call = endpoint.client, dict(request, model=endpoint.model)
+                limit["key"] = endpoint.name
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(limit["key"], estimated)
+            start = time.perf_counter()
+            if streaming:
+                call = dict(call, stream=True, stream_options={"include_usage": True})
+            try:
+                raw = await client.chat.completions.with_raw_response.create(**call)
+            except Exception as e:
+                if endpoint is not None:
+                    if is_retryable(e):
+                        self.router.record_failure(endpoint)
+                    else:
+                        self.router.release(endpoint)
+                raise
+            if self.rate_limiter is not None:
+                self.rate_limiter.update_from_headers(limit["key"], raw.headers)
+            if streaming:
+                try:
+                    result = await self._read_stream(raw.parse(), request.get("n", 1), start, outcome)
+                except Exception:
+                    # the body broke off mid-stream: that is the endpoint failing too
+                    if endpoint is not None:
+                        self.router.record_failure(endpoint)
+                    raise
+                if endpoint is not None:
+                    self.router.record_success(endpoint, time.perf_counter() - start)
+                    outcome["backend"] = endpoint.name
+                return result
+            response = raw.parse()
+            if endpoint is not None:
+                self.router.record_success(endpoint, time.perf_counter() - start)
+                outcome["backend"] = endpoint.name
+            if scoring:
+                first = response.choices[0].logprobs.content[0]
+                outcome["top_logprobs"] = [[top.token, top.logprob] for top in first.top_logprobs] or [
+                    [first.token, first.logprob]]
+            return [choice.message.content or "" for choice in response.choices], response.usage
+
+        def on_retry(attempt, exc, wait):
+            outcome["attempts"] = attempt
+            if self.rate_limiter is not None and getattr(exc, "status_code", None) == 429:
+                self.rate_limiter.penalize(limit["key"], wait)
+            log_retry(attempt, exc, wait)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        async with self._semaphore:
+            start = time.perf_counter()
+            try:
+                texts, usage = await self.retry_policy.call_async(attempt, on_retry)
+                outcome["response"] = texts[0].strip()
+                if "n" in request:
+                    outcome["responses"] = [text.strip() for text in texts]
+                outcome["usage"] = usage_of(usage)
+                if self.rate_limiter is not None and usage is not None:
+                    self.rate_limiter.record_usage(limit["key"], estimated, usage.total_tokens)
+                if self.cache is not None and (validate is None or validate(outcome) is None):
+                    if scoring:
+                        value = json.dumps({"response": outcome["response"], "top_logprobs": outcome["top_logprobs"]})
+                    else:
+                        value = json.dumps(outcome["responses"]) if "n" in request else outcome["response"]
+                    self.cache.put(self.cache.key(keys[outcome["backend"]]), value)
+            except Exception as e:
+                outcome["error"] = describe_error(e)
+                print(f"OpenAI access fail: {outcome['error']}")
+            outcome["latency"] = time.perf_counter() - start
+            outcome["attempts"] += 1
+        return outcome
+
+    async def _read_stream(self, stream, n, start, outcome):
+        """Collects a streamed completion's texts and usage, closing the stream early when allowed.
+
+        A stream cut short reports no usage.
+        """
+        texts = [""] * n
+        marks = [None] * n
+        usage = None
+        outcome["first_probability"] = None
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            for choice in chunk.choices:
+                texts[choice.index] += choice.delta.content or ""
+                if marks[choice.index] is None and self.probability_end is not None:
+                    marks[choice.index] = self.probability_end(texts[choice.index])
+            if outcome["first_probability"] is None and marks[0] is not None:
+                outcome["first_probability"] = time.perf_counter() - start
+            if self.stop_after is not None and all(
+                    mark is not None and len(text) - mark >= self.stop_after for text, mark in zip(texts, marks)):
+                outcome["stopped_early"] = True
+                await stream.close()
+                break
+        return texts, usage
+
+    async def get_openai_response(self, content, model=None):
+        return (await self.complete(content, model))["response"]
+
+    async def gather(self, contents, on_result=None, system_role=None, validate=None, **overrides):
+        results = [None] * len(contents)
+
+        async def run_one(pos, content):
+            results[pos] = await self.complete(content, system_role=system_role, validate=validate, **overrides)
+            if on_result is not None:
+                on_result(pos, results[pos])
+
+        await asyncio.gather(*(run_one(pos, content) for pos, content in enumerate(contents)))
+        return results
+
+    def run(self, coro):
+        """Runs coro on a fresh event loop; all gathers inside it share one concurrency limit."""
+        self._semaphore = None
+        return asyncio.run(coro)
+
+    def map(self, contents, on_result=None, system_role=None):
+        """Blocking entry point: returns one outcome per content, in order."""
+        return self.run(self.gather(contents, on_result, system_role))
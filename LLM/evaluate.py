@@ -0,0 +1,146 @@
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+from loader import normalize_labels, read_workbook
+from taxonomy import LABEL_FIELDS, label_accuracy, prediction_column
+
+GROUP_COLUMNS = ["Stage", "Root Cause", "Sub Root Cause"]
+
+
+def join_labels(run, labels):
+    """Attaches Type/Stage/Root Cause labels to a run's rows, matching on Link, or on Title when absent."""
+    run = normalize_labels(run)
+    labels = normalize_labels(labels)
+    key = "Link" if "Link" in run.columns and "Link" in labels.columns else "Title"
+    label_columns = [key, "Type"] + [c for c in GROUP_COLUMNS if c in labels.columns]
+    labels = labels[label_columns].dropna(subset=[key]).drop_duplicates(key)
+    run = run.drop(columns=[c for c in label_columns if c != key and c in run.columns])
+    joined = run.merge(labels, on=key, how="inner")
+    joined["probability"] = pd.to_numeric(joined["FalsePositive_Probability"], errors="coerce")
+    joined["label"] = (joined["Type"] == "FalsePositive").astype(int)
+    return joined[joined["Type"].isin(["FalsePositive", "Confirmed"])]
+
+
+def level_counts(scores, labels, weights):
+    """Positive/negative weight per distinct score level (ascending), one row per weight vector."""
+    levels, inverse = np.unique(scores, return_inverse=True)
+    onehot = np.zeros((len(scores), len(levels)))
+    onehot[np.arange(len(scores)), inverse] = 1.0
+    positives = weights @ (onehot * labels[:, None])
+    negatives = weights @ (onehot * (1 - labels)[:, None])
+    return levels, positives, negatives
+
+
+def roc_auc(positives, negatives):
+    # ties count one half, as in the Mann-Whitney U statistic
+    below = np.cumsum(negatives, axis=1) - negatives
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (positives * (below + 0.5 * negatives)).sum(axis=1) / (positives.sum(axis=1) * negatives.sum(axis=1))
+
+
+def average_precision(positives, negatives):
+    positives, negatives = positives[:, ::-1], negatives[:, ::-1]
+    tp, fp = np.cumsum(positives, axis=1), np.cumsum(negatives, axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        return (precision * positives).sum(axis=1) / positives.sum(axis=1)
+
+
+def best_threshold(levels, positives, negatives):
+    """Threshold (predict FalsePositive when p >= t) maximising F1, with its F1 and accuracy."""
+    positives, negatives = positives[0], negatives[0]
+    tp = np.cumsum(positives[::-1])[::-1]
+    fp = np.cumsum(negatives[::-1])[::-1]
+    fn = positives.sum() - tp
+    tn = negatives.sum() - fp
+    f1 = 2 * tp / np.maximum(2 * tp + fp + fn, 1e-12)
+    best = int(f1.argmax())
+    return {"threshold": float(levels[best]), "f1": float(f1[best]),
+            "accuracy": float((tp[best] + tn[best]) / (positives.sum() + negatives.sum()))}
+
+
+def calibration(scores, labels, bins=10):
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    which = np.clip(np.digitize(scores, edges[1:-1]), 0, bins - 1)
+    counts = np.bincount(which, minlength=bins)
+    predicted = np.bincount(which, weights=scores, minlength=bins)
+    observed = np.bincount(which, weights=labels, minlength=bins)
+    return [{"bin": f"{edges[b]:.1f}-{edges[b + 1]:.1f}", "count": int(counts[b]),
+             "mean_predicted": float(predicted[b] / counts[b]), "observed_rate": float(observed[b] / counts[b])}
+            for b in range(bins) if counts[b]]
+
+
+def evaluate(joined, bootstrap=1000, alpha=0.05, seed=0):
+    scored = joined.dropna(subset=["probability"])
+    scores = scored["probability"].to_numpy(dtype=float)
+    labels = scored["label"].to_numpy(dtype=float)
+    n = len(scores)
+    result = {"rows": len(joined), "scored": n, "unparsed": len(joined) - n}
+    if n == 0 or labels.min() == labels.max():
+        return result
+
+    levels, positives, negatives = level_counts(scores, labels, np.ones((1, n)))
+    result["roc_auc"] = float(roc_auc(positives, negatives)[0])
+    result["pr_auc"] = float(average_precision(positives, negatives)[0])
+    result.update(best_threshold(levels, positives, negatives))
+    result["calibration"] = calibration(scores, labels)
+
+    # every bootstrap replicate is a row of resampling multiplicities, scored in one matrix product
+    weights = np.random.default_rng(seed).multinomial(n, np.full(n, 1.0 / n), size=bootstrap).astype(float)
+    _, boot_positives, boot_negatives = level_counts(scores, labels, weights)
+    bounds = [100 * alpha / 2, 100 * (1 - alpha / 2)]
+    for name, values in (("roc_auc", roc_auc(boot_positives, boot_negatives)),
+                         ("pr_auc", average_precision(boot_positives, boot_negatives))):
+        result[f"{name}_ci"] = [float(v) for v in np.nanpercentile(values, bounds)]
+
+    threshold = result["threshold"]
+    fp_rows = scored[scored["label"] == 1]
+    result["breakdown"] = {}
+    for column in GROUP_COLUMNS:
+        if column not in fp_rows.columns:
+            continue
+        groups = fp_rows.groupby(fp_rows[column].fillna("(none)"))["probability"]
+        result["breakdown"][column] = {
+            str(value): {"count": int(len(p)), "mean_probability": float(p.mean()),
+                         "recall": float((p >= threshold).mean())}
+            for value, p in groups
+        }
+    if any(prediction_column(field) in scored.columns for field in LABEL_FIELDS):
+        result["label_accuracy"] = label_accuracy(scored)
+    return result
+
+
+def summary_table(results):
+    rows = []
+    for name, r in results.items():
+        rows.append({
+            "run": name, "scored": r["scored"], "unparsed": r["unparsed"],
+            "roc_auc": r.get("roc_auc"), "roc_auc_ci": r.get("roc_auc_ci"),
+            "pr_auc": r.get("pr_auc"), "pr_auc_ci": r.get("pr_auc_ci"),
+            "threshold": r.get("threshold"), "f1": r.get("f1"), "accuracy": r.get("accuracy"),
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score run outputs against the labelled datasets.")
+    parser.add_argument("runs", nargs="+", help="output workbooks of classification runs")
+    parser.add_argument("--labels", nargs="+", required=True, help="labelled dataset workbooks (dataset/*.xlsx)")
+    parser.add_argument("--bootstrap", type=int, default=1000)
+    parser.add_argument("--output", help="write the full results (incl. calibration and breakdowns) as JSON")
+    args = parser.parse_args()
+
+    # the datasets spell their columns differently, so align each before stacking them
+    labels = pd.concat([normalize_labels(read_workbook(path)) for path in args.labels], ignore_index=True)
+    results = {run: evaluate(join_labels(read_workbook(run), labels), args.bootstrap) for run in args.runs}
+    print(summary_table(results).to_string(index=False))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,13 @@
-from openai import OpenAI
-import pandas as pd
-import time
-import re
-
-client = OpenAI(
-    base_url='',
-    api_key=''
-)
+from config import make_engine
+from pipeline import main
+from prompt import build_prompt
+from retrieval import ExampleSelector
 
 input_file_path = "tvm_issue_with_example.xlsx"
+labelled_file_path = "../dataset/tvm_issue.xlsx"
 output_file_path = "tvm_issue_fewshot_choice.xlsx"
 
-df = pd.read_excel(input_file_path)
-
-def get_openai_response(content, model="gpt-4o"):
-    try:
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are an expert of TVM (a deep learning compiler)."},
-                {"role": "user", "content": content}
-            ],
-            temperature=0.8
-        )
-        return response.choices[0].message.content.strip()
-    except Exception as e:
-        print(f"OpenAI access fail，retrying: {e}")
-        time.sleep(10)
-        return None
-
-responses = []
-explanations = []
+system_role = "You are an expert of TVM (a deep learning compiler)."
 
 examples = {
     1: """
@@ -168,17 +145,7 @@ Reasoning: Although the error appears to stem from incorrect usage of the API, t
 """
 }
 
-for i, row in df.iterrows():
-    print(f"正在处理第 {i + 1} 行...")
-    title = row["Title"]
-    body = row["Body"]
-    fp_id = row["FP_Example"]
-    bug_id = row["Bug_Example"]
-    # print(f"fp_id: {fp_id}, bug_id: {bug_id}")
-    fp_example = examples.get(fp_id, "")
-    bug_example = examples.get(bug_id, "")
-    
-    content = f"""
+instructions = """
 You are assisting in the triage of issue reports submitted by users of the deep learning compiler **TVM**. Each issue report contains a **Title** and a **Description**.
 
 Your task is to analyze the issue and estimate the likelihood that the issue is a **FalsePositive** — meaning the problem is **not caused by a bug in the compiler**, but rather due to incorrect usage, invalid input, user environment misconfiguration, or misunderstanding of expected behavior. In contrast, if a issue is not a FalsePositive bug report, then it is a genuine bug in the deep learning compiler which was introduced by the compiler developers and must be fixed by modifying the compiler’s source code.
@@ -204,14 +171,6 @@ then it is **not** a FalsePositive. It should be treated as a genuine bug in the
 
 ---
 
-## Examples
-### Example 1:
-{fp_example}
-
-### Example 2:
-{bug_example}
----
-
 ## Output Format
 
 Please output your response in **exactly** the following format:
@@ -223,29 +182,25 @@ Reasoning: <Brief explanation referencing the likely root cause and your rationa
 ```
 
 ---
-# Use this format to classify the issue below:
-# - **Title**: {title}
-# - **Description**: {body}
 """
-    response = get_openai_response(content)
-    explanations.append(response)
 
-    confidence = None
-    reasoning = ""
 
-    if response:
-        confidence_match = re.search(r"FalsePositive_Probability:\s*([0-9]*\.?[0-9]+)", response)
-        reasoning_match = re.search(r"Reasoning:\s*(.+)", response, re.IGNORECASE | re.DOTALL)
+select_examples = ExampleSelector(examples, labelled_file_path, "tvm_issue_examples.index.pkl")
+
 
-        if confidence_match:
-            confidence = confidence_match.group(1)
-        if reasoning_match:
-            reasoning = reasoning_match.group(1).strip()
+def build_content(row, extra_instructions=""):
+    fp_example, bug_example = select_examples(row)
+    return build_prompt(instructions + extra_instructions, fp_example, bug_example, row["Title"], row["Body"])
 
-    df.at[i, "FalsePositive_Probability"] = confidence
-    df.at[i, "Reasoning"] = reasoning
-    df.at[i, "Explanation"] = explanations[-1]
 
-    df.to_excel(output_file_path, index=False)
+profile = {
+    "name": "tvm_issue",
+    "system_role": system_role,
+    "build_content": build_content,
+    "input_file_path": input_file_path,
+    "labelled_file_path": labelled_file_path,
+    "output_file_path": output_file_path,
+}
 
-    time.sleep(3)
\ No newline at end of file
+if __name__ == "__main__":
+    main([profile], make_engine())
@@ -0,0 +1,125 @@
+import argparse
+import html
+import os
+import re
+from urllib.parse import urlsplit
+
+import pandas as pd
+
+from loader import iter_rows, normalize_labels, read_workbook
+
+TAG = re.compile(r"<[^>]+>")
+GITHUB_API = re.compile(r"^api\.github\.com/repos/(.+)$")
+DISCOURSE_TOPIC = re.compile(r"^(.*)/t/(?:[^/]+/)?(\d+)(?:/\d+)?$")
+
+
+def canonical_link(url):
+    """Normalises a GitHub or Discourse URL so dataset links and export links hash to the same key.
+
+    Drops scheme, "www.", query, fragment and trailing slash; maps API URLs and pull requests to
+    github.com/<owner>/<repo>/issues/<n>, and Discourse /t/<slug>/<id>[/<post>] to /t/<id>.
+    """
+    if not isinstance(url, str) or not url.strip():
+        return None
+    parts = urlsplit(url.strip() if "://" in url else "https://" + url.strip())
+    host = parts.netloc.lower().removeprefix("www.")
+    link = f"{host}{parts.path}".rstrip("/")
+    api = GITHUB_API.match(link)
+    if api:
+        link = "github.com/" + api.group(1)
+    if link.startswith("github.com/"):
+        link = re.sub(r"/pulls?/(\d+)$", r"/issues/\1", link)
+    topic = DISCOURSE_TOPIC.match(link)
+    if topic and not link.startswith("github.com/"):
+        link = f"{topic.group(1)}/t/{topic.group(2)}"
+    return link
+
+
+def record_link(record, discourse_base=None):
+    for field in ("html_url", "Link", "link", "URL", "url"):
+        if record.get(field):
+            return record[field]
+    if discourse_base and record.get("id") is not None and "post_stream" in record:
+        return f"{discourse_base.rstrip('/')}/t/{record['id']}"
+    return None
+
+
+def record_body(record):
+    """Issue body from a GitHub issue, or the first post from a Discourse topic or post."""
+    if record.get("body") is not None:
+        return record["body"]
+    posts = (record.get("post_stream") or {}).get("posts") or [record]
+    post = posts[0]
+    if post.get("raw") is not None:
+        return post["raw"]
+    if post.get("cooked") is not None:
+        return html.unescape(TAG.sub("", post["cooked"])).strip()
+    return None
+
+
+def build_index(links):
+    """Hash index from canonical link to the dataset positions that carry it."""
+    index = {}
+    for pos, link in enumerate(links):
+        key = canonical_link(link)
+        if key is not None:
+            index.setdefault(key, []).append(pos)
+    return index
+
+
+def fill_bodies(df, export_paths, discourse_base=None, column="Body"):
+    """Streams the exports once and fills df[column] for every row whose Link appears in them.
+
+    Rows that already have a body keep it. Returns the number of rows filled.
+    """
+    index = build_index(df["Link"].tolist())
+    bodies = {}
+    scanned = 0
+    for path in export_paths:
+        for _, record in iter_rows(path):
+            scanned += 1
+            key = canonical_link(record_link(record, discourse_base))
+            if key in index and key not in bodies:
+                body = record_body(record)
+                if body:
+                    bodies[key] = body
+        print(f"{path}: 已扫描 {scanned} 条记录，匹配 {len(bodies)} 个链接")
+
+    if column not in df.columns:
+        df[column] = None
+    df[column] = df[column].astype(object)
+    filled = 0
+    for key, positions in index.items():
+        if key not in bodies:
+            continue
+        for pos in positions:
+            current = df.iat[pos, df.columns.get_loc(column)]
+            if current is None or (not isinstance(current, str) and pd.isna(current)) or current == "":
+                df.iat[pos, df.columns.get_loc(column)] = bodies[key]
+                filled += 1
+    return filled
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the Body column of a labelled dataset from offline "
+                                                 "GitHub/Discourse exports (JSONL, optionally gzipped).")
+    parser.add_argument("dataset", help="labelled workbook, e.g. ../dataset/tvm_issue.xlsx")
+    parser.add_argument("exports", nargs="+", help="export files, one issue/topic JSON object per line")
+    parser.add_argument("--output", help="output workbook (default: <dataset name>_with_body.xlsx)")
+    parser.add_argument("--discourse-base", metavar="URL",
+                        help="forum URL for Discourse topic records without a url field, "
+                             "e.g. https://discuss.tvm.apache.org")
+    args = parser.parse_args()
+
+    df = normalize_labels(read_workbook(args.dataset))
+    filled = fill_bodies(df, args.exports, args.discourse_base)
+    missing = df["Body"].isna() | (df["Body"] == "")
+    output = args.output or os.path.splitext(os.path.basename(args.dataset))[0] + "_with_body.xlsx"
+    df.to_excel(output, index=False)
+    print(f"{output}: 填充 {filled} 行，仍缺少正文 {int(missing.sum())} 行")
+    for link in df.loc[missing, "Link"].head(10):
+        print(f"  missing: {link}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import json
+import os
+
+INVALID_RESPONSE = "invalid response"
+
+
+def is_answered(record):
+    """Whether a record holds a parsed answer that passed validation, so its row need not be asked again."""
+    return (record["Explanation"] is not None and record["FalsePositive_Probability"] is not None
+            and not (record.get("Failure_Reason") or "").startswith(INVALID_RESPONSE))
+
+
+class Journal:
+    """Append-only JSONL log of finished rows, keyed by DataFrame index."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def load(self):
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # a crash mid-write leaves at most one truncated trailing line
+                    continue
+                records[record["row"]] = record
+        return records
+
+    def done_rows(self, keep=None):
+        """Rows whose latest record is answered (and accepted by `keep`, if given), read without keeping
+        the records in memory."""
+        rows = set()
+        if not os.path.exists(self.path):
+            return rows
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if is_answered(record) and (keep is None or keep(record)):
+                    rows.add(record["row"])
+                else:
+                    rows.discard(record["row"])
+        return rows
+
+    def append(self, record):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def journal_path_for(output_file_path):
+    return os.path.splitext(output_file_path)[0] + ".journal.jsonl"
@@ -0,0 +1,113 @@
+import gzip
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+
+CACHE_DIR = ".arrow_cache"
+
+# the three labelled datasets spell the same columns differently
+LABEL_COLUMN_ALIASES = {
+    "URL": "Link",
+    "RootCause": "Root Cause",
+    "SubRootCause": "Sub Root Cause",
+    "sub root cause": "Sub Root Cause",
+    "Symtom": "Symptom",
+}
+
+
+def normalize_labels(df):
+    return df.rename(columns={old: new for old, new in LABEL_COLUMN_ALIASES.items() if old in df.columns})
+
+
+def cache_path_for(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, CACHE_DIR, name + ".arrow")
+
+
+def source_stamp(path):
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}".encode()
+
+
+def _write_cache(df, path, cache_path):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"source_stamp": source_stamp(path)})
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    # uncompressed Arrow IPC so later reads can memory-map it
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache_path)
+
+
+def _cache_is_fresh(path, cache_path):
+    if not os.path.exists(cache_path):
+        return False
+    metadata = feather.read_table(cache_path, columns=[], memory_map=True).schema.metadata or {}
+    return metadata.get(b"source_stamp") == source_stamp(path)
+
+
+def read_workbook(path, columns=None):
+    """Reads an .xlsx through a memory-mapped Arrow copy, rebuilt when the workbook changes."""
+    if pa is None:
+        return pd.read_excel(path, usecols=columns)
+
+    cache_path = cache_path_for(path)
+    if not _cache_is_fresh(path, cache_path):
+        df = pd.read_excel(path)
+        try:
+            _write_cache(df, path, cache_path)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            print(f"无法缓存 {path}: {e}")
+            return df[columns] if columns else df
+
+    table = feather.read_table(cache_path, columns=columns, memory_map=True)
+    return table.to_pandas()
+
+
+def _iter_xlsx(path):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def _iter_jsonl(path):
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _iter_parquet(path, columns, batch_size=1024):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+        yield from batch.to_pylist()
+
+
+def iter_rows(path, columns=None):
+    """Yields (row index, row dict) lazily from .xlsx, .jsonl(.gz) or .parquet without loading the whole file."""
+    if path.endswith(".parquet"):
+        rows = _iter_parquet(path, columns)
+    elif path.endswith((".jsonl", ".jsonl.gz")):
+        rows = _iter_jsonl(path)
+    else:
+        rows = _iter_xlsx(path)
+    for i, row in enumerate(rows):
+        if columns is not None:
+            row = {column: row.get(column) for column in columns}
+        yield i, row
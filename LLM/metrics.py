@@ -0,0 +1,104 @@
+import json
+import math
+import time
+from contextlib import contextmanager
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of values (q in 0-100), or None when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+class Metrics:
+    """Collects per-stage timings and per-request counters for one classification run."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.latencies = []
+        self.probability_latencies = []
+        self.rows = 0
+        self.failures = 0
+        self.invalid = 0
+        self.retries = 0
+        self.cache_hits = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.started = time.perf_counter()
+        self.finished = None
+        self.extra = {}
+
+    @contextmanager
+    def time(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages.setdefault(stage, []).append(time.perf_counter() - start)
+
+    def record_outcome(self, outcome):
+        self.rows += 1
+        if outcome["response"] is None:
+            self.failures += 1
+        elif outcome.get("invalid") is not None:
+            # answered, but still unusable after the re-asks
+            self.invalid += 1
+        self.retries += max(0, outcome["attempts"] - 1)
+        if outcome["cache_hit"]:
+            self.cache_hits += 1
+        elif outcome.get("latency") is not None:
+            self.latencies.append(outcome["latency"])
+            if outcome.get("first_probability") is not None:
+                self.probability_latencies.append(outcome["first_probability"])
+        usage = outcome.get("usage") or {}
+        self.prompt_tokens += usage.get("prompt_tokens") or 0
+        self.cached_tokens += usage.get("cached_tokens") or 0
+        self.completion_tokens += usage.get("completion_tokens") or 0
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def summary(self):
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return {
+            "name": self.name,
+            "rows": self.rows,
+            "elapsed_s": elapsed,
+            "rows_per_s": self.rows / elapsed if elapsed else 0.0,
+            "failures": self.failures,
+            "invalid": self.invalid,
+            "retries": self.retries,
+            "cache_hits": self.cache_hits,
+            "latency_s": {f"p{q}": percentile(self.latencies, q) for q in (50, 95, 99)},
+            "time_to_probability_s": {f"p{q}": percentile(self.probability_latencies, q) for q in (50, 95, 99)},
+            "tokens": {
+                "prompt": self.prompt_tokens,
+                "cached": self.cached_tokens,
+                "completion": self.completion_tokens,
+            },
+            "stages_s": {stage: {"total": sum(durations), "count": len(durations),
+                                 "p50": percentile(durations, 50), "p95": percentile(durations, 95)}
+                         for stage, durations in self.stages.items()},
+            **self.extra,
+        }
+
+    def report(self):
+        s = self.summary()
+        latency = " / ".join(f"{v:.2f}s" if v is not None else "-" for v in s["latency_s"].values())
+        tokens = s["tokens"]
+        stages = ", ".join(f"{stage} {v['total']:.2f}s" for stage, v in s["stages_s"].items())
+        if self.probability_latencies:
+            latency += " (概率首达 " + " / ".join(
+                f"{v:.2f}s" for v in s["time_to_probability_s"].values()) + ")"
+        return (f"{s['name']}: {s['rows']} 行, {s['elapsed_s']:.1f}s, {s['rows_per_s']:.2f} 行/s, "
+                f"延迟 p50/p95/p99 {latency}, 重试 {s['retries']}, 缓存命中 {s['cache_hits']}, "
+                f"失败 {s['failures']}, 无效回答 {s['invalid']}, 输入 {tokens['prompt']} tokens (前缀缓存 {tokens['cached']}), "
+                f"输出 {tokens['completion']} tokens; 各阶段: {stages}")
+
+    def write(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
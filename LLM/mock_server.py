@@ -0,0 +1,201 @@
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_REASONING = ("The report points at the user's environment rather than the compiler: the failing call is "
+                    "made with arguments the documentation rules out, and the maintainers resolved it without a "
+                    "code change.")
+
+
+class MockSettings:
+    """Latency distribution and fault injection for the mock chat-completions endpoint."""
+
+    def __init__(self, latency=0.5, sigma=0.5, error_rate=0.0, rate_limit_rate=0.0, retry_after=1.0,
+                 rpm_limit=10000, tpm_limit=2000000, seed=None, drop_rate=0.0):
+        self.latency = latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        # fraction of streamed responses whose connection breaks off halfway through the body
+        self.drop_rate = drop_rate
+        self.retry_after = retry_after
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def draw(self):
+        """Returns (delay in seconds, injected status or None) for one request."""
+        with self.lock:
+            self.requests += 1
+            # log-normal with the configured median, like real completion latencies
+            delay = self.latency * self.random.lognormvariate(0, self.sigma) if self.latency > 0 else 0.0
+            roll = self.random.random()
+            probability = round(self.random.choice([0.05, 0.2, 0.5, 0.8, 0.95]), 2)
+        if roll < self.rate_limit_rate:
+            return 0.0, 429, probability
+        if roll < self.rate_limit_rate + self.error_rate:
+            return delay, 500, probability
+        if roll < self.rate_limit_rate + self.error_rate + self.drop_rate:
+            return delay, "drop", probability
+        return delay, None, probability
+
+
+def completion_body(request, probability):
+    prompt = "".join(m.get("content") or "" for m in request.get("messages", []))
+    if request.get("logprobs"):
+        return verdict_body(request, probability)
+    if request.get("response_format"):
+        text = json.dumps({"FalsePositive_Probability": probability, "Reasoning": CANNED_REASONING})
+    else:
+        text = f"FalsePositive_Probability: {probability}\n\nReasoning: {CANNED_REASONING}"
+    choices = [{"index": k, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+               for k in range(request.get("n") or 1)]
+    prompt_tokens = len(prompt) // 4
+    completion_tokens = (len(text) // 4) * len(choices)
+    return {
+        "id": f"chatcmpl-mock-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": choices,
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens,
+                  "prompt_tokens_details": {"cached_tokens": 0}},
+    }
+
+
+def verdict_body(request, probability):
+    """A one-token FalsePositive/Bug answer whose top_logprobs put `probability` on FalsePositive."""
+    probability = min(max(probability, 1e-6), 1 - 1e-6)
+    alternatives = sorted([("False", math.log(probability)), ("Bug", math.log(1 - probability))],
+                          key=lambda item: -item[1])
+    token, logprob = alternatives[0]
+    logprobs = {"content": [{"token": token, "logprob": logprob, "bytes": list(token.encode()),
+                             "top_logprobs": [{"token": t, "logprob": lp, "bytes": list(t.encode())}
+                                              for t, lp in alternatives]}]}
+    prompt_tokens = sum(len(m.get("content") or "") for m in request.get("messages", [])) // 4
+    return {
+        "id": f"chatcmpl-mock-{time.time_ns()}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "mock"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": token}, "logprobs": logprobs,
+                     "finish_reason": "length"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 1, "total_tokens": prompt_tokens + 1,
+                  "prompt_tokens_details": {"cached_tokens": 0}},
+    }
+
+
+def stream_events(body):
+    """Splits a completion body into chat.completion.chunk events of about one token each."""
+    base = {"id": body["id"], "object": "chat.completion.chunk", "created": body["created"], "model": body["model"]}
+    for choice in body["choices"]:
+        text = choice["message"]["content"]
+        for start in range(0, len(text), 4):
+            yield dict(base, choices=[{"index": choice["index"], "delta": {"content": text[start:start + 4]},
+                                       "finish_reason": None}])
+        yield dict(base, choices=[{"index": choice["index"], "delta": {}, "finish_reason": "stop"}])
+    yield dict(base, choices=[], usage=body["usage"])
+
+
+def make_handler(settings):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body, headers=None):
+            payload = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("x-ratelimit-limit-requests", str(settings.rpm_limit))
+            self.send_header("x-ratelimit-limit-tokens", str(settings.tpm_limit))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+            delay, status, probability = settings.draw()
+            time.sleep(delay)
+            if status == 429:
+                self._send(429, {"error": {"message": "mock rate limit", "type": "rate_limit_exceeded"}},
+                           {"retry-after": str(settings.retry_after)})
+            elif status == 500:
+                self._send(500, {"error": {"message": "mock server error", "type": "server_error"}})
+            elif request.get("stream"):
+                self._stream(completion_body(request, probability), delay, drop=status == "drop")
+            else:
+                self._send(200, completion_body(request, probability))
+
+        def _stream(self, body, delay, drop=False):
+            # the configured latency is the time to the first token; each further token takes 1/50 of it
+            events = [f"data: {json.dumps(event)}\n\n".encode("utf-8") for event in stream_events(body)]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            if drop:
+                # announce the full body, then close halfway: the client sees an incomplete read
+                self.send_header("Content-Length", str(sum(map(len, events)) + len(b"data: [DONE]\n\n")))
+                events = events[:len(events) // 2]
+            self.send_header("Connection", "close")
+            self.send_header("x-ratelimit-limit-requests", str(settings.rpm_limit))
+            self.send_header("x-ratelimit-limit-tokens", str(settings.tpm_limit))
+            self.end_headers()
+            self.close_connection = True
+            try:
+                for event in events:
+                    self.wfile.write(event)
+                    self.wfile.flush()
+                    time.sleep(delay / 50)
+                if not drop:
+                    self.wfile.write(b"data: [DONE]\n\n")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client stopped reading early
+
+    return Handler
+
+
+def start_mock_server(settings, host="127.0.0.1", port=0):
+    """Serves the mock endpoint from a daemon thread; returns the server (its base_url is server.base_url)."""
+    server = ThreadingHTTPServer((host, port), make_handler(settings))
+    server.daemon_threads = True
+    server.base_url = f"http://{host}:{server.server_address[1]}/v1"
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible chat-completions stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.5, help="median response latency in seconds")
+    parser.add_argument("--sigma", type=float, default=0.5, help="log-normal spread of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction answered with 429")
+    parser.add_argument("--drop-rate", type=float, default=0.0,
+                        help="fraction of streamed responses cut off halfway through the body")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    settings = MockSettings(args.latency, args.sigma, args.error_rate, args.rate_limit_rate, args.retry_after,
+                            seed=args.seed, drop_rate=args.drop_rate)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(settings))
+    print(f"mock chat-completions endpoint at http://{args.host}:{args.port}/v1")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,524 @@
+import argparse
+import asyncio
+import os
+import re
+
+import pandas as pd
+
+from cascade import Cascade, LocalClassifier, tier_report
+from compaction import Compactor
+from dedup import MinHashLSH
+from engine import combine_outcomes
+from journal import INVALID_RESPONSE, Journal, is_answered, journal_path_for
+from loader import iter_rows, read_workbook
+from metrics import Metrics
+from shard import collect_shards, iter_shard, parse_shard, select_shard, sharded_profile
+from structured import RESPONSE_FORMAT, parse_json, validation_error
+from taxonomy import Taxonomy
+from verdict import VERDICT_REQUEST, VerdictScorer, verdict_probability
+
+KEY_COLUMNS = ["Title", "Link", "URL"]
+RESULT_COLUMNS = ["FalsePositive_Probability", "Reasoning", "Explanation", "Failure_Reason",
+                  "Prompt_Tokens", "Cached_Tokens", "Completion_Tokens"]
+
+
+def parse_response(response):
+    confidence = None
+    reasoning = ""
+
+    if response:
+        answer = parse_json(response)
+        if answer is not None and answer[0] is not None:
+            return answer
+        # free-text answers; tolerates markdown bold around the label ("FalsePositive_Probability**: 0.05")
+        # and JSON cut short by an early-stopped stream
+        confidence_match = re.search(r'FalsePositive_Probability\**"?\s*:\**\s*"?([0-9]*\.?[0-9]+)', response)
+        reasoning_match = re.search(r"Reasoning:\s*(.+)", response, re.IGNORECASE | re.DOTALL)
+
+        if confidence_match:
+            confidence = confidence_match.group(1)
+        if reasoning_match:
+            reasoning = reasoning_match.group(1).strip()
+
+    return confidence, reasoning
+
+
+# a probability is complete once something other than a digit or point follows it
+PROBABILITY_END = re.compile(r'FalsePositive_Probability\**"?\s*:\**\s*"?[0-9]*\.?[0-9]+(?=[^0-9.])')
+
+
+def probability_end(text):
+    """Offset just past the streamed probability in text, or None while it is still incomplete."""
+    match = PROBABILITY_END.search(text)
+    return match.end() if match else None
+
+
+def response_error(outcome):
+    """Engine validator: an error string when none of the responses yields a usable answer.
+
+    Answers cut off after the probability by an early-stopped stream need no reasoning.
+    """
+    errors = [validation_error(*parse_response(response), require_reasoning=not outcome["stopped_early"])
+              for response in outcome["responses"] or [outcome["response"]]]
+    return None if None in errors else errors[0]
+
+
+def label_validator(taxonomy, validate):
+    """Extends an engine validator with the taxonomy's checks on the Stage/Root Cause labels."""
+    def check(outcome):
+        error = validate(outcome) if validate is not None else None
+        if error is None and not outcome["stopped_early"]:
+            error = taxonomy.error(outcome["response"], parse_response(outcome["response"])[0])
+        return error
+    return check
+
+
+def label_options(engine, taxonomy):
+    """Per-call engine arguments asking for and validating the taxonomy's labels."""
+    if taxonomy is None:
+        return {}
+    options = {"validate": label_validator(taxonomy, engine.validate)}
+    if engine.response_format is not None:
+        options["response_format"] = taxonomy.response_format()
+    return options
+
+
+def aggregate_samples(responses):
+    """Mean/median/variance of the parsed probabilities plus the majority side's most typical sample.
+
+    Returns None when no sample could be parsed.
+    """
+    parsed = [(float(confidence), reasoning, response)
+              for response in responses
+              for confidence, reasoning in [parse_response(response)]
+              if confidence is not None and 0.0 <= float(confidence) <= 1.0]
+    if not parsed:
+        return None
+    probabilities = pd.Series([p for p, _, _ in parsed])
+    median = float(probabilities.median())
+    false_positive_votes = int((probabilities >= 0.5).sum())
+    majority = [item for item in parsed if (item[0] >= 0.5) == (false_positive_votes * 2 >= len(parsed))]
+    _, reasoning, response = min(majority, key=lambda item: abs(item[0] - median))
+    return {
+        "FalsePositive_Probability": f"{probabilities.mean():.4f}",
+        "Probability_Median": median,
+        "Probability_Variance": float(probabilities.var(ddof=0)),
+        "Samples": len(parsed),
+        "Reasoning": reasoning,
+        "Explanation": response,
+    }
+
+
+def make_record(row, outcome):
+    response = outcome["response"]
+    usage = outcome.get("usage") or {}
+    confidence, reasoning = parse_response(response)
+    error = outcome.get("error")
+    invalid = None
+    if response is not None:
+        invalid = validation_error(confidence, reasoning, require_reasoning=not outcome.get("stopped_early"))
+    if invalid is not None:
+        error = error or f"{INVALID_RESPONSE}: {invalid}"
+        if confidence is not None and not 0.0 <= float(confidence) <= 1.0:
+            confidence = None
+    record = {
+        "row": int(row),
+        "FalsePositive_Probability": confidence,
+        "Reasoning": reasoning,
+        "Explanation": response,
+        "Failure_Reason": error,
+        "Prompt_Tokens": usage.get("prompt_tokens"),
+        "Cached_Tokens": usage.get("cached_tokens"),
+        "Completion_Tokens": usage.get("completion_tokens"),
+    }
+    if outcome.get("responses"):
+        aggregated = aggregate_samples(outcome["responses"])
+        if aggregated is not None:
+            record.update(aggregated, Failure_Reason=outcome.get("error"))
+    if outcome.get("reasks"):
+        record["Reasks"] = outcome["reasks"]
+    if outcome.get("backend"):
+        record["Backend"] = outcome["backend"]
+    if outcome.get("first_probability") is not None:
+        record["Time_To_Probability"] = outcome["first_probability"]
+        record["Stopped_Early"] = outcome["stopped_early"]
+    return record
+
+
+def apply_records(df, records):
+    # optional fields (e.g. Cluster_Id) only become columns when some record carries them
+    columns = list(RESULT_COLUMNS)
+    for record in records.values():
+        columns += [key for key in record if key not in columns and key != "row" and key not in KEY_COLUMNS]
+    for i in df.index:
+        record = records.get(int(i))
+        for column in columns:
+            df.at[i, column] = record.get(column) if record else None
+    return df
+
+
+def report_text(row):
+    return " ".join("" if pd.isna(row.get(column)) else str(row.get(column)) for column in ("Title", "Body"))
+
+
+def content_builder(build_content, taxonomy):
+    """build_content with the label instructions joined to the static instructions, ahead of the
+    per-row examples and report, so the prompt prefix stays shared between rows."""
+    if taxonomy is None:
+        return build_content
+    extra_instructions = taxonomy.instructions()
+    return lambda row: build_content(row, extra_instructions)
+
+
+def settled(record, cascade=None, scorer=None):
+    """Whether a journalled record can be kept on resume.
+
+    Rows settled by the local classifier or the verdict token are only kept while that tier is
+    enabled and its band would still settle them; otherwise they are asked again.
+    """
+    if not is_answered(record):
+        return False
+    tier = record.get("Tier")
+    if tier == "local":
+        return cascade is not None and record.get("Local_Probability") is not None \
+            and not cascade.escalate(record["Local_Probability"])
+    if tier == "verdict":
+        return scorer is not None and record.get("Verdict_Probability") is not None \
+            and not scorer.escalate(record["Verdict_Probability"])
+    return True
+
+
+async def classify_dataframe_async(df, build_content, engine, output_file_path, system_role=None,
+                                  journal_path=None, dedup=None, cascade=None, compactor=None, scorer=None,
+                                  taxonomy=None):
+    """Classifies every row of df not yet in the journal, then writes the output workbook.
+
+    With `dedup` (a MinHashLSH), only one representative per near-duplicate cluster is sent to the
+    model; the other members copy its result and every row records its Cluster_Id. With `cascade`,
+    rows the local classifier is confident about are settled locally (Tier "local") and only the
+    uncertain ones reach the LLM (Tier "llm"). With `compactor`, long bodies are shrunk to a token
+    budget before the prompt is built and each row records its Compression_Ratio. With `scorer` (a
+    VerdictScorer), rows are first scored from a one-token verdict's log-probabilities (Tier
+    "verdict") and only borderline ones get a full reasoned answer (Tier "llm"). With `taxonomy`, the
+    same request also predicts the Stage / Root Cause / Sub Root Cause categories; build_content then
+    gets the label instructions as a second argument to add to its static instructions.
+    """
+    journal = Journal(journal_path or journal_path_for(output_file_path))
+    build_content = content_builder(build_content, taxonomy)
+    metrics = Metrics(output_file_path)
+    # rows that failed, never gave a valid answer or were settled by a tier that is now off are retried
+    done = {row: record for row, record in journal.load().items() if settled(record, cascade, scorer)}
+    pending = [i for i in df.index if int(i) not in done]
+    if done:
+        print(f"{output_file_path}: 从日志恢复 {len(done)} 行，剩余 {len(pending)} 行")
+
+    cluster_of = {}
+    if dedup is not None:
+        with metrics.time("dedup"):
+            representatives = dedup.clusters([report_text(df.loc[i]) for i in df.index])
+        cluster_of = {int(i): int(df.index[rep]) for i, rep in zip(df.index, representatives)}
+
+    def copy_result(record, i):
+        copy = dict(record, row=int(i))
+        journal.append(copy)
+        done[int(i)] = copy
+
+    def finish_row(i, record):
+        if int(i) in compression:
+            record["Compression_Ratio"] = compression[int(i)]
+        if cluster_of:
+            record["Cluster_Id"] = cluster_of[int(i)]
+        if int(i) in local_probability:
+            record["Local_Probability"] = local_probability[int(i)]
+            record["Tier"] = "llm" if record["Explanation"] is None or cascade.escalate(
+                local_probability[int(i)]) else "local"
+        if int(i) in verdicts:
+            record["Verdict_Probability"] = verdicts[int(i)]
+            record["Tier"] = "llm" if int(i) in verdict_outcomes else "verdict"
+        with metrics.time("journal_write"):
+            journal.append(record)
+            for member in members.pop(int(i), []):
+                copy_result(record, member)
+        done[int(i)] = record
+
+    compression = {}
+    verdicts = {}
+    verdict_outcomes = {}
+    queried = []
+    members = {}
+    for i in pending:
+        rep = cluster_of.get(int(i), int(i))
+        if rep == int(i):
+            queried.append(i)
+        elif rep in done:
+            copy_result(done[rep], i)
+        else:
+            members.setdefault(rep, []).append(i)
+    if cluster_of:
+        print(f"{output_file_path}: 去重后请求 {len(queried)} 行，{len(pending) - len(queried)} 行复用代表行结果")
+
+    local_probability = {}
+    if cascade is not None and queried:
+        with metrics.time("cascade"):
+            probabilities = cascade.score([df.loc[i] for i in queried])
+        escalated = []
+        for i, probability in zip(queried, probabilities):
+            local_probability[int(i)] = float(probability)
+            if cascade.escalate(probability):
+                escalated.append(i)
+            else:
+                finish_row(i, make_record(i, {"response": cascade.local_response(probability)}))
+        print(f"{output_file_path}: 本地模型判定 {len(queried) - len(escalated)} 行，升级 {len(escalated)} 行到 LLM")
+        queried = escalated
+
+    contents = []
+    for i in queried:
+        row = df.loc[i]
+        if compactor is not None:
+            with metrics.time("compaction"):
+                row, compression[int(i)] = compactor(row)
+        with metrics.time("prompt_build"):
+            contents.append(build_content(row))
+
+    def on_verdict(pos, outcome):
+        i = queried[pos]
+        verdicts[int(i)] = verdict_probability(outcome["top_logprobs"])
+        if scorer.escalate(verdicts[int(i)]):
+            verdict_outcomes[int(i)] = outcome
+            return
+        metrics.record_outcome(outcome)
+        with metrics.time("parse"):
+            record = make_record(i, dict(outcome, response=scorer.verdict_response(verdicts[int(i)])))
+        finish_row(i, record)
+        print(f"第 {int(i) + 1} 行已记录到 {journal.path}")
+
+    def on_result(pos, outcome):
+        i = queried[pos]
+        if int(i) in verdict_outcomes:
+            outcome = combine_outcomes(verdict_outcomes[int(i)], outcome)
+        metrics.record_outcome(outcome)
+        with metrics.time("parse"):
+            record = make_record(i, outcome)
+            if taxonomy is not None and record["Explanation"] is not None:
+                record.update(taxonomy.record(record["Explanation"], record["FalsePositive_Probability"]))
+        finish_row(i, record)
+        print(f"第 {int(i) + 1} 行已记录到 {journal.path}")
+
+    try:
+        if scorer is not None and contents:
+            await engine.gather([scorer.content(content) for content in contents], on_verdict, system_role,
+                                **VERDICT_REQUEST)
+            keep = [pos for pos, i in enumerate(queried) if int(i) in verdict_outcomes]
+            print(f"{output_file_path}: 判决 token 判定 {len(queried) - len(keep)} 行，{len(keep)} 行需要完整回答")
+            queried = [queried[pos] for pos in keep]
+            contents = [contents[pos] for pos in keep]
+        await engine.gather(contents, on_result, system_role, **label_options(engine, taxonomy))
+    finally:
+        journal.close()
+
+    apply_records(df, done)
+    with metrics.time("xlsx_write"):
+        df.to_excel(output_file_path, index=False)
+    metrics.finish()
+    tiers = tier_report(df)
+    if tiers is not None:
+        metrics.extra["cascade"] = tiers
+        print(f"{output_file_path}: 分层统计 {tiers}")
+    print(metrics.report())
+    metrics.write(metrics_path_for(output_file_path))
+    return df
+
+
+async def classify_stream_async(rows, build_content, engine, output_file_path, system_role=None,
+                                journal_path=None, window=None, compactor=None, taxonomy=None):
+    """Classifies (index, row) pairs as they are read, keeping at most `window` rows in memory.
+
+    Results go only to the journal, each record carrying the row's Title/Link so it stands alone.
+    """
+    journal = Journal(journal_path or journal_path_for(output_file_path))
+    build_content = content_builder(build_content, taxonomy)
+    metrics = Metrics(output_file_path)
+    done = journal.done_rows(settled)
+    window = window or engine.concurrency * 2
+    in_flight = set()
+
+    options = label_options(engine, taxonomy)
+
+    async def handle(i, row, content, ratio):
+        outcome = await engine.complete(content, system_role=system_role, **options)
+        metrics.record_outcome(outcome)
+        with metrics.time("parse"):
+            record = make_record(i, outcome)
+            if taxonomy is not None and record["Explanation"] is not None:
+                record.update(taxonomy.record(record["Explanation"], record["FalsePositive_Probability"]))
+            record.update({column: row[column] for column in KEY_COLUMNS if column in row})
+            if ratio is not None:
+                record["Compression_Ratio"] = ratio
+        with metrics.time("journal_write"):
+            journal.append(record)
+        print(f"第 {i + 1} 行已记录到 {journal.path}")
+
+    try:
+        for i, row in rows:
+            if i in done:
+                continue
+            ratio = None
+            if compactor is not None:
+                with metrics.time("compaction"):
+                    row, ratio = compactor(row)
+            with metrics.time("prompt_build"):
+                content = build_content(row)
+            in_flight.add(asyncio.create_task(handle(i, row, content, ratio)))
+            if len(in_flight) >= window:
+                finished, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    # re-raises a failure in handle() instead of dropping it with the task
+                    task.result()
+        await asyncio.gather(*in_flight)
+    except BaseException:
+        for task in in_flight:
+            task.cancel()
+        raise
+    finally:
+        journal.close()
+
+    metrics.finish()
+    print(metrics.report())
+    metrics.write(metrics_path_for(output_file_path))
+
+
+def metrics_path_for(output_file_path):
+    return os.path.splitext(output_file_path)[0] + ".metrics.json"
+
+
+def classify_dataframe(df, build_content, engine, output_file_path, system_role=None, journal_path=None):
+    return engine.run(classify_dataframe_async(df, build_content, engine, output_file_path, system_role,
+                                               journal_path))
+
+
+def load_profile(profile):
+    df = read_workbook(profile["input_file_path"])
+    if profile.get("shard"):
+        df = select_shard(df, *profile["shard"])
+    return df
+
+
+def profile_rows(profile):
+    rows = iter_rows(profile["input_file_path"])
+    if profile.get("shard"):
+        rows = iter_shard(rows, *profile["shard"])
+    return rows
+
+
+def merge_shards(profile, count):
+    """Rebuilds the profile's ordered output workbook from the journals of its `count` shards."""
+    df = read_workbook(profile["input_file_path"])
+    records, missing, duplicated = collect_shards(df, profile["output_file_path"], count)
+    if missing:
+        print(f"{profile['name']}: 分片结果缺少 {len(missing)} 行: {missing[:10]}")
+    if duplicated:
+        print(f"{profile['name']}: {len(duplicated)} 行出现在多个分片中: {dict(list(duplicated.items())[:10])}")
+    apply_records(df, records)
+    df.to_excel(profile["output_file_path"], index=False)
+    print(f"{profile['output_file_path']}: 已合并 {count} 个分片，共 {len(records)} 行")
+    return missing, duplicated
+
+
+def profile_taxonomy(profile, labels):
+    return Taxonomy.from_dataset(profile["labelled_file_path"]) if labels else None
+
+
+async def classify_profiles(profiles, engine, stream=False, labels=False, **options):
+    """Runs every profile's dataset through one engine, so they share its worker pool and rate limiter.
+
+    `options` (dedup, cascade, compactor, scorer) are passed to each run; streaming runs only take compactor.
+    With `labels`, each run also predicts the categories of its profile's labelled dataset.
+    """
+    if stream:
+        runs = (classify_stream_async(profile_rows(profile), profile["build_content"], engine,
+                                      profile["output_file_path"], profile["system_role"],
+                                      compactor=options.get("compactor"),
+                                      taxonomy=profile_taxonomy(profile, labels))
+                for profile in profiles)
+    else:
+        runs = (classify_dataframe_async(load_profile(profile), profile["build_content"], engine,
+                                         profile["output_file_path"], profile["system_role"],
+                                         taxonomy=profile_taxonomy(profile, labels), **options)
+                for profile in profiles)
+    await asyncio.gather(*runs)
+
+
+def main(profiles, engine):
+    from batch import export_batch, ingest_batch
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-export", metavar="JSONL", help="write Batch API requests instead of calling the API")
+    parser.add_argument("--batch-ingest", metavar="JSONL", help="merge a completed Batch API output file")
+    parser.add_argument("--stream", action="store_true",
+                        help="read rows lazily and write results only to the journal, with flat memory use")
+    parser.add_argument("--dedup", type=float, metavar="JACCARD", nargs="?", const=0.8,
+                        help="classify one representative per near-duplicate Title+Body cluster "
+                             "(similarity threshold, default 0.8; ignored with --stream)")
+    parser.add_argument("--cascade", type=float, nargs=2, metavar=("LOW", "HIGH"),
+                        help="score rows with the local title classifier first and only send rows whose "
+                             "P(FalsePositive) lies in [LOW, HIGH] to the LLM (ignored with --stream)")
+    parser.add_argument("--samples", type=int, default=1, metavar="N",
+                        help="request N completions per row in one call and aggregate their probabilities")
+    parser.add_argument("--body-budget", type=int, metavar="TOKENS",
+                        help="compact each Body (repeated frames/log lines, long code blocks) to about TOKENS")
+    parser.add_argument("--structured", action="store_true",
+                        help="request a JSON-schema answer with typed probability and reasoning fields")
+    parser.add_argument("--reask", type=int, default=2, metavar="N",
+                        help="re-ask a row up to N times when its answer cannot be parsed or is out of range")
+    parser.add_argument("--shard", type=parse_shard, metavar="K/N",
+                        help="process only shard K of N (rows split by a stable hash of Link, else row id); "
+                             "results go to <output>.shard-K-of-N.xlsx")
+    parser.add_argument("--merge-shards", type=int, metavar="N",
+                        help="merge the journals of N shards into the ordered output workbook")
+    parser.add_argument("--stream-completions", action="store_true",
+                        help="stream each completion and record the time until its probability arrives")
+    parser.add_argument("--stop-after", type=int, metavar="CHARS",
+                        help="with --stream-completions, close the stream CHARS characters of reasoning "
+                             "after the probability (0: right after it)")
+    parser.add_argument("--verdict", type=float, nargs=2, metavar=("LOW", "HIGH"),
+                        help="score rows from the log-probabilities of a one-token FalsePositive/Bug verdict and "
+                             "only ask for a reasoned answer when P(FalsePositive) lies in [LOW, HIGH] "
+                             "(ignored with --stream)")
+    parser.add_argument("--labels", action="store_true",
+                        help="also predict Stage, Root Cause and Sub Root Cause in the same request, "
+                             "restricted to the categories used in the profile's labelled dataset")
+    args = parser.parse_args()
+    if args.shard and not args.merge_shards:
+        profiles = [sharded_profile(profile, *args.shard) for profile in profiles]
+    engine.samples = args.samples
+    engine.validate = response_error
+    engine.reask = args.reask
+    if args.structured:
+        engine.response_format = RESPONSE_FORMAT
+    engine.stream = args.stream_completions or args.stop_after is not None
+    engine.stop_after = args.stop_after
+    engine.probability_end = probability_end
+    compactor = Compactor(args.body_budget) if args.body_budget else None
+    scorer = VerdictScorer(*args.verdict) if args.verdict else None
+    dedup = MinHashLSH(threshold=args.dedup) if args.dedup else None
+    cascade = None
+    if args.cascade:
+        classifier = LocalClassifier.load_or_build("local_classifier.model.pkl")
+        print(f"本地模型 out-of-fold AUC: {classifier.auc:.3f}")
+        cascade = Cascade(classifier, *args.cascade)
+
+    if args.merge_shards:
+        problems = [merge_shards(profile, args.merge_shards) for profile in profiles]
+        if any(missing or duplicated for missing, duplicated in problems):
+            raise SystemExit(1)
+    elif args.batch_export:
+        export_batch(profiles, engine, args.batch_export, compactor=compactor)
+    elif args.batch_ingest:
+        ingest_batch(profiles, args.batch_ingest)
+    else:
+        engine.run(classify_profiles(profiles, engine, args.stream, dedup=dedup, cascade=cascade,
+                                     labels=args.labels, compactor=compactor, scorer=scorer))
+        if engine.cache is not None:
+            print(engine.cache.summary())
+        if engine.router is not None:
+            print(engine.router.summary())
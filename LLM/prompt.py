@@ -0,0 +1,22 @@
+EXAMPLES_TEMPLATE = """
+## Examples
+### Example 1:
+{fp_example}
+
+### Example 2:
+{bug_example}
+---
+"""
+
+REPORT_TEMPLATE = """
+# Use this format to classify the issue below:
+# - **Title**: {title}
+# - **Description**: {body}
+"""
+
+
+def build_prompt(instructions, fp_example, bug_example, title, body):
+    """Static instructions come first so providers can reuse the cached prefix; per-row text follows."""
+    return (instructions
+            + EXAMPLES_TEMPLATE.format(fp_example=fp_example, bug_example=bug_example)
+            + REPORT_TEMPLATE.format(title=title, body=body))
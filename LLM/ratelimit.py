@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    @property
+    def rate(self):
+        return self.capacity / 60
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= amount
+
+    def set_limit(self, per_minute):
+        self._refill()
+        self.capacity = float(per_minute)
+        self.level = min(self.level, self.capacity)
+
+    def sync_remaining(self, remaining):
+        self._refill()
+        self.level = min(self.level, float(remaining))
+
+
+class RateLimiter:
+    """Per-model request and token budgets, adjusted from x-ratelimit-* response headers."""
+
+    def __init__(self, limits=None, default_rpm=500, default_tpm=30000, max_output_tokens=400):
+        self.limits = limits or {}
+        self.default_rpm = default_rpm
+        self.default_tpm = default_tpm
+        self.max_output_tokens = max_output_tokens
+        self._buckets = {}
+
+    def buckets(self, model):
+        if model not in self._buckets:
+            rpm, tpm = self.limits.get(model, (self.default_rpm, self.default_tpm))
+            self._buckets[model] = (TokenBucket(rpm), TokenBucket(tpm))
+        return self._buckets[model]
+
+    def estimate_tokens(self, messages, n=1, max_tokens=None):
+        # ~4 characters per token is close enough for budgeting English prompts
+        return sum(len(m["content"]) for m in messages) // 4 + (max_tokens or self.max_output_tokens) * n
+
+    def _try_acquire(self, model, tokens):
+        requests, token_bucket = self.buckets(model)
+        wait = max(requests.wait_time(1), token_bucket.wait_time(tokens))
+        if wait <= 0:
+            requests.take(1)
+            token_bucket.take(tokens)
+        return wait
+
+    async def acquire(self, model, tokens):
+        while (wait := self._try_acquire(model, tokens)) > 0:
+            await asyncio.sleep(wait)
+
+    def record_usage(self, model, estimated, actual):
+        if actual is not None:
+            self.buckets(model)[1].take(actual - estimated)
+
+    def update_from_headers(self, model, headers):
+        requests, token_bucket = self.buckets(model)
+        for bucket, kind in ((requests, "requests"), (token_bucket, "tokens")):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if limit:
+                bucket.set_limit(float(limit))
+            if remaining:
+                bucket.sync_remaining(float(remaining))
+
+    def penalize(self, model, seconds):
+        """Pauses the model's request budget for roughly `seconds` after a 429."""
+        requests, _ = self.buckets(model)
+        requests.sync_remaining(-requests.rate * seconds)
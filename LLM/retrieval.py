@@ -0,0 +1,171 @@
+import hashlib
+import os
+import pickle
+import re
+
+import numpy as np
+import pandas as pd
+
+from ingest import canonical_link
+from loader import normalize_labels, read_workbook
+from pipeline import parse_response
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+except ImportError:
+    TfidfVectorizer = None
+
+DATASET_EXAMPLE_TEMPLATE = """
+**Title**: {title}
+**Description**: {description}
+```
+FalsePositive_Probability: {probability}
+
+Reasoning: {reasoning}
+```
+"""
+
+
+def _text(value):
+    return "" if pd.isna(value) else str(value)
+
+
+def title_key(title):
+    """Whitespace- and case-insensitive form of a title, for recognising a report's own copy."""
+    return " ".join(_text(title).split()).casefold()
+
+
+EXAMPLE_TITLE = re.compile(r"^\**Title\**:\s*(.+?)\s*$", re.MULTILINE)
+MARKDOWN_ESCAPE = re.compile(r"\\([\\`*_{}\[\]()#+\-.!|<>])")
+
+
+def example_title(text):
+    """The report title of a hand-written example (its **Title** line, markdown escapes removed)."""
+    match = EXAMPLE_TITLE.search(text)
+    return MARKDOWN_ESCAPE.sub(r"\1", match.group(1)) if match else ""
+
+
+def pool_from_examples(examples):
+    """Hand-written few-shot examples, labelled by the probability written in them.
+
+    Many are worked answers for real dataset reports, so each keeps its title to be excluded for them.
+    """
+    pool = []
+    for example_id, text in examples.items():
+        confidence, _ = parse_response(text)
+        label = "FalsePositive" if confidence is not None and float(confidence) >= 0.5 else "Confirmed"
+        pool.append({"id": example_id, "title": example_title(text), "link": None, "label": label,
+                     "text": text, "example": text})
+    return pool
+
+
+def pool_from_dataset(path):
+    """Labelled reports rendered as compact examples from their Title/Type/Stage/Root Cause columns."""
+    df = normalize_labels(read_workbook(path))
+    pool = []
+    for _, row in df.iterrows():
+        title = _text(row["Title"])
+        label = _text(row["Type"])
+        if label == "FalsePositive":
+            cause = " / ".join(filter(None, (_text(row.get("Root Cause")), _text(row.get("Sub Root Cause")))))
+            description = f"Reported at the {_text(row.get('Stage')) or 'unknown'} stage."
+            reasoning = f"Not a compiler bug; root cause: {cause or 'user-side'}."
+            probability = 0.95
+        elif label == "Confirmed":
+            description = "Reported against the compiler."
+            reasoning = "Confirmed by the developers as a genuine compiler bug."
+            probability = 0.05
+        else:
+            continue
+        example = DATASET_EXAMPLE_TEMPLATE.format(title=title, description=description,
+                                                  probability=probability, reasoning=reasoning)
+        text = " ".join((title, _text(row.get("Stage")), _text(row.get("Root Cause")),
+                         _text(row.get("Sub Root Cause"))))
+        pool.append({"id": _text(row.get("Link")) or title, "title": title,
+                     "link": canonical_link(_text(row.get("Link"))), "label": label,
+                     "text": text, "example": example})
+    return pool
+
+
+def pool_signature(pool):
+    digest = hashlib.sha256()
+    for item in pool:
+        digest.update(f"{item['id']}\0{item['title']}\0{item.get('link')}\0{item['label']}\0{item['text']}\0".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ExampleIndex:
+    """TF-IDF index over a labelled example pool, persisted to disk and rebuilt when the pool changes."""
+
+    def __init__(self, pool, vectorizer, matrix):
+        self.pool = pool
+        self.vectorizer = vectorizer
+        self.matrix = matrix
+        self.labels = np.array([item["label"] for item in pool])
+        self.titles = np.array([title_key(item["title"]) for item in pool])
+        self.links = np.array([item.get("link") or "" for item in pool])
+
+    @classmethod
+    def build(cls, pool):
+        if TfidfVectorizer is None:
+            raise ImportError("example retrieval needs scikit-learn (pip install scikit-learn)")
+        vectorizer = TfidfVectorizer(sublinear_tf=True, ngram_range=(1, 2), min_df=1, max_features=50000)
+        matrix = vectorizer.fit_transform([item["text"] for item in pool])
+        return cls(pool, vectorizer, matrix)
+
+    @classmethod
+    def load_or_build(cls, path, pool):
+        signature = pool_signature(pool)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                saved = pickle.load(f)
+            if saved["signature"] == signature:
+                return cls(saved["pool"], saved["vectorizer"], saved["matrix"])
+        index = cls.build(pool)
+        with open(path, "wb") as f:
+            pickle.dump({"signature": signature, "pool": pool, "vectorizer": index.vectorizer,
+                         "matrix": index.matrix}, f)
+        return index
+
+    def nearest(self, query, label, exclude_title=None, exclude_link=None):
+        scores = (self.matrix @ self.vectorizer.transform([query]).T).toarray().ravel()
+        mask = self.labels == label
+        # never hand a report its own labelled copy, matched by canonical link or normalised title
+        if exclude_title and title_key(exclude_title):
+            mask &= self.titles != title_key(exclude_title)
+        if exclude_link:
+            mask &= self.links != exclude_link
+        if not mask.any():
+            return None
+        scores[~mask] = -1.0
+        return self.pool[int(scores.argmax())]
+
+
+class ExampleSelector:
+    """Uses a row's hand-picked FP_Example/Bug_Example ids, retrieving the nearest examples when missing."""
+
+    def __init__(self, examples, dataset_path, index_path):
+        self.examples = examples
+        self.dataset_path = dataset_path
+        self.index_path = index_path
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            pool = pool_from_examples(self.examples) + pool_from_dataset(self.dataset_path)
+            self._index = ExampleIndex.load_or_build(self.index_path, pool)
+        return self._index
+
+    def _pick(self, row, column, label, query):
+        example_id = row.get(column)
+        if example_id is not None and not pd.isna(example_id) and example_id in self.examples:
+            return self.examples[example_id]
+        link = canonical_link(_text(row.get("Link")) or _text(row.get("URL")))
+        item = self.index.nearest(query, label, exclude_title=_text(row.get("Title")), exclude_link=link)
+        return item["example"] if item else ""
+
+    def __call__(self, row):
+        query = f"{_text(row.get('Title'))} {_text(row.get('Body'))[:4000]}"
+        return (self._pick(row, "FP_Example", "FalsePositive", query),
+                self._pick(row, "Bug_Example", "Confirmed", query))
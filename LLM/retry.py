@@ -0,0 +1,86 @@
+import asyncio
+import email.utils
+import random
+import time
+
+import openai
+
+try:
+    import httpx
+    # openai raises these unwrapped when a connection drops while a stream is being read
+    TRANSPORT_ERRORS = (httpx.TransportError,)
+except ImportError:
+    TRANSPORT_ERRORS = ()
+
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+def is_retryable(exc):
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError) + TRANSPORT_ERRORS):
+        return True
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in RETRYABLE_STATUS or exc.status_code >= 500
+    return False
+
+
+def describe_error(exc):
+    status = getattr(exc, "status_code", None)
+    prefix = f"{type(exc).__name__} ({status})" if status else type(exc).__name__
+    return f"{prefix}: {str(exc)[:200]}"
+
+
+def retry_after(exc):
+    """Seconds the server asked us to wait, from Retry-After / retry-after-ms, or None."""
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter; only retryable errors are retried."""
+
+    def __init__(self, max_attempts=6, base_delay=1.0, max_delay=60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt, exc):
+        hinted = retry_after(exc)
+        if hinted is not None:
+            return hinted + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _should_retry(self, attempt, exc):
+        return attempt < self.max_attempts and is_retryable(exc)
+
+    async def call_async(self, fn, on_retry=None):
+        attempt = 1
+        while True:
+            try:
+                return await fn()
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                wait = self.delay(attempt, e)
+                if on_retry is not None:
+                    on_retry(attempt, e, wait)
+                await asyncio.sleep(wait)
+                attempt += 1
+
+
+def log_retry(attempt, exc, wait):
+    print(f"OpenAI access fail，{wait:.1f}s 后第 {attempt} 次重试: {describe_error(exc)}")
@@ -0,0 +1,91 @@
+import random
+import time
+
+
+class Endpoint:
+    """One OpenAI-compatible backend with its observed latency, error rate and circuit state."""
+
+    def __init__(self, name, client, model, weight=1.0, smoothing=0.2):
+        self.name = name
+        self.client = client
+        self.model = model
+        self.weight = weight
+        self.smoothing = smoothing
+        self.latency = None
+        self.error_rate = 0.0
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.requests = 0
+        self.errors = 0
+
+    def _observe(self, failed, latency=None):
+        self.requests += 1
+        self.errors += failed
+        # exponentially weighted, so a backend that recovers regains its share
+        self.error_rate += self.smoothing * (failed - self.error_rate)
+        if latency is not None:
+            self.latency = latency if self.latency is None else self.latency + self.smoothing * (latency - self.latency)
+
+    def score(self):
+        # the first requests assume a 1 s latency until one has been measured
+        return self.weight * (1.0 - self.error_rate) / max(self.latency or 1.0, 1e-3)
+
+
+class Router:
+    """Spreads requests over endpoints in proportion to weight x success rate / latency.
+
+    After `failure_threshold` consecutive failures an endpoint's circuit opens and it gets no
+    traffic for `cooldown` seconds; then a single probe request decides whether it closes again.
+    """
+
+    def __init__(self, endpoints, failure_threshold=5, cooldown=30.0, seed=None):
+        self.endpoints = endpoints
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.random = random.Random(seed)
+
+    def available(self, endpoint, now):
+        if endpoint.opened_at is None:
+            return True
+        return not endpoint.probing and now - endpoint.opened_at >= self.cooldown
+
+    def pick(self):
+        now = time.monotonic()
+        candidates = [endpoint for endpoint in self.endpoints if self.available(endpoint, now)]
+        if not candidates:
+            # every circuit is open: use the one that has been resting longest rather than stall
+            candidates = [min(self.endpoints, key=lambda endpoint: endpoint.opened_at)]
+        endpoint = self.random.choices(candidates, [max(e.score(), 1e-6) for e in candidates])[0]
+        if endpoint.opened_at is not None:
+            endpoint.probing = True
+        return endpoint
+
+    def record_success(self, endpoint, latency):
+        endpoint._observe(False, latency)
+        endpoint.failures = 0
+        endpoint.opened_at = None
+        endpoint.probing = False
+
+    def record_failure(self, endpoint):
+        endpoint._observe(True)
+        endpoint.failures += 1
+        if endpoint.probing or endpoint.failures >= self.failure_threshold:
+            if endpoint.opened_at is None or endpoint.probing:
+                print(f"后端 {endpoint.name} 连续失败 {endpoint.failures} 次，暂停 {self.cooldown:.0f}s")
+            endpoint.opened_at = time.monotonic()
+            endpoint.probing = False
+
+    def release(self, endpoint):
+        """Ends a probe that failed for a reason unrelated to the endpoint's health."""
+        endpoint.probing = False
+
+    def summary(self):
+        return "; ".join(f"{endpoint.name}: {endpoint.requests} 次请求, {endpoint.errors} 次失败, "
+                         f"延迟 {endpoint.latency or 0:.2f}s{' (熔断中)' if endpoint.opened_at is not None else ''}"
+                         for endpoint in self.endpoints)
+
+    def stats(self):
+        return {endpoint.name: {"requests": endpoint.requests, "errors": endpoint.errors,
+                                "latency_s": endpoint.latency, "circuit_open": endpoint.opened_at is not None}
+                for endpoint in self.endpoints}
@@ -0,0 +1,14 @@
+import gpt_few_openvino_choice
+import gpt_few_tvm_discussion_choice
+import gpt_few_tvm_issue_choice
+from config import make_engine
+from pipeline import main
+
+profiles = [
+    gpt_few_tvm_issue_choice.profile,
+    gpt_few_tvm_discussion_choice.profile,
+    gpt_few_openvino_choice.profile,
+]
+
+if __name__ == "__main__":
+    main(profiles, make_engine())
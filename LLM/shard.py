@@ -0,0 +1,70 @@
+import hashlib
+import os
+
+import pandas as pd
+
+from journal import Journal, journal_path_for
+
+
+def parse_shard(spec):
+    """Parses "K/N" (shard K of N, counting from 0)."""
+    index, count = (int(part) for part in spec.split("/"))
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"invalid shard {spec!r}: expected K/N with 0 <= K < N")
+    return index, count
+
+
+def shard_key(i, row):
+    """The row's Link (or URL), falling back to its row id when it has none."""
+    for column in ("Link", "URL"):
+        value = row.get(column)
+        if value is not None and not pd.isna(value) and str(value).strip():
+            return str(value).strip()
+    return f"row-{int(i)}"
+
+
+def shard_of(key, count):
+    # sha256 rather than hash(), which is salted per process
+    return int.from_bytes(hashlib.sha256(key.encode("utf-8")).digest()[:8], "big") % count
+
+
+def select_shard(df, index, count):
+    """The rows of df in shard index, keeping their original index so results merge back by row."""
+    keep = [shard_of(shard_key(i, row), count) == index for i, row in df.iterrows()]
+    return df[keep]
+
+
+def iter_shard(rows, index, count):
+    for i, row in rows:
+        if shard_of(shard_key(i, row), count) == index:
+            yield i, row
+
+
+def shard_path(output_file_path, index, count):
+    stem, ext = os.path.splitext(output_file_path)
+    return f"{stem}.shard-{index}-of-{count}{ext}"
+
+
+def sharded_profile(profile, index, count):
+    return dict(profile, shard=(index, count),
+                output_file_path=shard_path(profile["output_file_path"], index, count))
+
+
+def collect_shards(df, output_file_path, count):
+    """Reads every shard's journal; returns (records by row, missing rows, rows found in several shards).
+
+    A row recorded by more than one shard keeps the record from the shard it hashes to.
+    """
+    records = {}
+    owners = {}
+    for index in range(count):
+        path = journal_path_for(shard_path(output_file_path, index, count))
+        for row, record in Journal(path).load().items():
+            if record["Explanation"] is None or row not in df.index:
+                continue
+            owners.setdefault(row, []).append(index)
+            if row not in records or shard_of(shard_key(row, df.loc[row]), count) == index:
+                records[row] = record
+    missing = [int(i) for i in df.index if int(i) not in records]
+    duplicated = {row: shards for row, shards in owners.items() if len(shards) > 1}
+    return records, missing, duplicated
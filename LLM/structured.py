@@ -0,0 +1,64 @@
+import json
+import re
+
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "FalsePositive_Probability": {"type": "number", "minimum": 0.0, "maximum": 1.0},
+        "Reasoning": {"type": "string"},
+    },
+    "required": ["FalsePositive_Probability", "Reasoning"],
+    "additionalProperties": False,
+}
+
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "false_positive_verdict", "strict": True, "schema": RESPONSE_SCHEMA},
+}
+
+JSON_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+
+def parse_json(response):
+    """Returns (probability, reasoning) from a JSON answer, or None when the text is not a JSON object."""
+    text = JSON_FENCE.sub("", response.strip())
+    if not text.startswith("{"):
+        return None
+    try:
+        answer = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(answer, dict):
+        return None
+    probability = answer.get("FalsePositive_Probability")
+    reasoning = answer.get("Reasoning")
+    if isinstance(probability, str):
+        try:
+            probability = float(probability)
+        except ValueError:
+            probability = None
+    if isinstance(probability, bool) or not isinstance(probability, (int, float)):
+        probability = None
+    return (None if probability is None else str(float(probability)),
+            reasoning.strip() if isinstance(reasoning, str) else "")
+
+
+def validation_error(confidence, reasoning, require_reasoning=True):
+    """Describes why a parsed answer is unusable, or returns None when it is valid."""
+    if confidence is None:
+        return "no FalsePositive_Probability found"
+    if not 0.0 <= float(confidence) <= 1.0:
+        return f"FalsePositive_Probability {confidence} is outside [0, 1]"
+    if require_reasoning and not reasoning:
+        return "no Reasoning found"
+    return None
+
+
+def reask_messages(response, error):
+    """Follow-up turns asking the model to correct an invalid answer."""
+    return [
+        {"role": "assistant", "content": response},
+        {"role": "user", "content": f"Your answer could not be used ({error}). Reply again with a "
+                                    "FalsePositive_Probability between 0.0 and 1.0 and a Reasoning, "
+                                    "in the requested format."},
+    ]
@@ -0,0 +1,148 @@
+import json
+import re
+
+import pandas as pd
+
+from loader import normalize_labels, read_workbook
+from structured import JSON_FENCE, RESPONSE_SCHEMA
+
+LABEL_FIELDS = ["Stage", "Root Cause", "Sub Root Cause"]
+
+
+def label_key(value):
+    """Spelling-insensitive key, so "API Misuse" and "API misuse" are the same category."""
+    return re.sub(r"[^a-z0-9]", "", str(value).lower())
+
+
+NONE_KEYS = {label_key(value) for value in ("", "None", "N/A", "null")}
+
+
+def prediction_column(field):
+    return "Predicted_" + field.replace(" ", "_")
+
+
+def _spellings(values):
+    """Distinct categories in order of frequency, each under its most frequent spelling."""
+    chosen = {}
+    for value in values.value_counts().index:
+        chosen.setdefault(label_key(value), str(value).strip())
+    return list(chosen.values())
+
+
+class Taxonomy:
+    """The Stage / Root Cause / Sub Root Cause categories a dataset labels its FalsePositives with."""
+
+    def __init__(self, values, sub_causes):
+        self.values = values
+        self.sub_causes = sub_causes
+        self.canonical = {field: {label_key(v): v for v in values[field]} for field in LABEL_FIELDS}
+
+    @classmethod
+    def from_dataset(cls, path):
+        df = normalize_labels(read_workbook(path))
+        df = df[df["Type"] == "FalsePositive"]
+        values = {field: _spellings(df[field].dropna()) for field in LABEL_FIELDS}
+        root_of = {label_key(v): v for v in values["Root Cause"]}
+        sub_of = {label_key(v): v for v in values["Sub Root Cause"]}
+        sub_causes = {root: [] for root in values["Root Cause"]}
+        for root, sub in df[["Root Cause", "Sub Root Cause"]].dropna().itertuples(index=False):
+            root, sub = root_of[label_key(root)], sub_of[label_key(sub)]
+            if sub not in sub_causes[root]:
+                sub_causes[root].append(sub)
+        return cls(values, sub_causes)
+
+    def instructions(self):
+        roots = "\n".join(f"  - {root}: {', '.join(subs) or 'None'}" for root, subs in self.sub_causes.items())
+        return f"""
+# Also classify the issue with the categories below, choosing values exactly as written.
+# - **Stage** at which the problem shows up: {', '.join(self.values['Stage'])}
+# - **Root Cause**, followed by the **Sub Root Cause** options under it:
+{roots}
+# Give these lines between FalsePositive_Probability and Reasoning. When FalsePositive_Probability is below 0.5 (a genuine compiler bug), write None for all three.
+```
+Stage: <Stage or None>
+Root Cause: <Root Cause or None>
+Sub Root Cause: <Sub Root Cause or None>
+```
+"""
+
+    def response_format(self):
+        schema = {
+            "type": "object",
+            "properties": {
+                "FalsePositive_Probability": RESPONSE_SCHEMA["properties"]["FalsePositive_Probability"],
+                **{field: {"type": "string", "enum": self.values[field] + ["None"]} for field in LABEL_FIELDS},
+                "Reasoning": RESPONSE_SCHEMA["properties"]["Reasoning"],
+            },
+            "additionalProperties": False,
+        }
+        schema["required"] = list(schema["properties"])
+        return {"type": "json_schema",
+                "json_schema": {"name": "false_positive_labels", "strict": True, "schema": schema}}
+
+    def raw_labels(self, response):
+        """The label fields as written in a JSON or free-text answer (None where absent)."""
+        if not response:
+            return {field: None for field in LABEL_FIELDS}
+        try:
+            answer = json.loads(JSON_FENCE.sub("", response.strip()))
+        except ValueError:
+            answer = None
+        if isinstance(answer, dict):
+            return {field: answer.get(field) for field in LABEL_FIELDS}
+        labels = {}
+        for field in LABEL_FIELDS:
+            match = re.search(rf"^[\s*#-]*{field}\**\s*:\**\s*(.+?)\s*$", response, re.IGNORECASE | re.MULTILINE)
+            labels[field] = match.group(1).strip("*` ") if match else None
+        return labels
+
+    def labels(self, response):
+        """Returns ({field: category or None}, error or None) with spellings mapped to the dataset's."""
+        labels = {}
+        errors = []
+        for field, value in self.raw_labels(response).items():
+            if value is None or label_key(value) in NONE_KEYS:
+                labels[field] = None
+            elif label_key(value) in self.canonical[field]:
+                labels[field] = self.canonical[field][label_key(value)]
+            else:
+                labels[field] = None
+                errors.append(f"{field} {value!r} is not one of the allowed categories")
+        root, sub = labels["Root Cause"], labels["Sub Root Cause"]
+        if root and sub and sub not in self.sub_causes[root]:
+            errors.append(f"Sub Root Cause {sub!r} does not belong to Root Cause {root!r}")
+        return labels, "; ".join(errors) or None
+
+    def error(self, response, probability):
+        """Why the labels of an answer are unusable, or None; false positives must carry all three."""
+        labels, error = self.labels(response)
+        if error is None and probability is not None and 0.5 <= float(probability) <= 1.0:
+            missing = [field for field in LABEL_FIELDS if labels[field] is None
+                       and not (field == "Sub Root Cause" and labels["Root Cause"]
+                                and not self.sub_causes[labels["Root Cause"]])]
+            if missing:
+                error = f"missing {', '.join(missing)} for a FalsePositive"
+        return error
+
+    def record(self, response, probability=None):
+        labels, _ = self.labels(response)
+        error = self.error(response, probability)
+        record = {prediction_column(field): value for field, value in labels.items()}
+        if error is not None:
+            record["Label_Error"] = error
+        return record
+
+
+def label_accuracy(df):
+    """Share of labelled FalsePositive rows whose predicted category matches, per field."""
+    accuracy = {}
+    for field in LABEL_FIELDS:
+        column = prediction_column(field)
+        if column not in df.columns or field not in df.columns:
+            continue
+        rows = df[(df["Type"] == "FalsePositive") & df[field].notna()]
+        if len(rows):
+            matches = [label_key(p) == label_key(t) if not pd.isna(p) else False
+                       for p, t in zip(rows[column], rows[field])]
+            accuracy[field] = {"rows": len(rows), "accuracy": sum(matches) / len(rows)}
+    return accuracy
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+# the scripts import each other by bare module name from LLM/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from openai import AsyncOpenAI  # noqa: E402
+
+from cache import ResponseCache  # noqa: E402
+from engine import AsyncEngine  # noqa: E402
+from mock_server import MockSettings, start_mock_server  # noqa: E402
+from pipeline import response_error  # noqa: E402
+from retry import RetryPolicy  # noqa: E402
+
+
+@pytest.fixture
+def mock_server():
+    """Starts in-process mock endpoints: mock_server(**MockSettings options) -> (settings, server)."""
+    servers = []
+
+    def start(**options):
+        settings = MockSettings(**dict({"latency": 0.01, "sigma": 0.0, "seed": 1}, **options))
+        servers.append(start_mock_server(settings))
+        return settings, servers[-1]
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+@pytest.fixture
+def mock_engine(tmp_path):
+    """Builds an engine against a mock server, with a response cache in tmp_path unless cache=False."""
+
+    def make(server, cache=True, **options):
+        # a client per run: AsyncOpenAI connections do not survive the event loop they were opened on
+        client = AsyncOpenAI(base_url=server.base_url, api_key="mock", max_retries=0)
+        options.setdefault("retry_policy", RetryPolicy(base_delay=0.01, max_delay=0.05))
+        return AsyncEngine(client, "You are an expert of TVM (a deep learning compiler).",
+                           cache=ResponseCache(str(tmp_path / "cache.sqlite")) if cache else None,
+                           validate=response_error, **options)
+
+    return make
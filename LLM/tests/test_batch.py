@@ -0,0 +1,60 @@
+import json
+import os
+
+import pandas as pd
+
+from batch import export_batch, ingest_batch
+from compaction import Compactor
+from engine import AsyncEngine
+from journal import Journal, journal_path_for
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "batch_output.jsonl")
+
+
+def test_export_ingest_round_trip(tmp_path):
+    input_path = str(tmp_path / "input.xlsx")
+    pd.DataFrame({"Title": ["layout error", "segfault in pass", "wrong output"],
+                  "Body": ["b0", "b1", "b2"]}).to_excel(input_path, index=False)
+    profile = {
+        "name": "fixture",
+        "system_role": "You are an expert of TVM (a deep learning compiler).",
+        "build_content": lambda row: f"{row['Title']}\n{row['Body']}",
+        "input_file_path": input_path,
+        "output_file_path": str(tmp_path / "output.xlsx"),
+    }
+    engine = AsyncEngine(None, "unused")
+
+    batch_path = str(tmp_path / "requests.jsonl")
+    export_batch([profile], engine, batch_path)
+    with open(batch_path, encoding="utf-8") as f:
+        requests = [json.loads(line) for line in f]
+    with open(FIXTURE, encoding="utf-8") as f:
+        expected_ids = [json.loads(line)["custom_id"] for line in f]
+    assert [request["custom_id"] for request in requests] == expected_ids
+    assert requests[1]["body"]["messages"] == [
+        {"role": "system", "content": profile["system_role"]},
+        {"role": "user", "content": "segfault in pass\nb1"},
+    ]
+
+    ingest_batch([profile], FIXTURE)
+    df = pd.read_excel(profile["output_file_path"])
+    assert df.loc[0, "FalsePositive_Probability"] == 0.85
+    assert df.loc[0, "Cached_Tokens"] == 1024
+    assert pd.isna(df.loc[0, "Failure_Reason"])
+    # a null message content is recorded as an invalid answer instead of crashing the ingest
+    assert df.loc[1, "Failure_Reason"].startswith("invalid response")
+    assert df.loc[2, "Failure_Reason"].startswith("status 500")
+    assert sorted(Journal(journal_path_for(profile["output_file_path"])).load()) == [0, 1, 2]
+
+
+def test_export_applies_body_budget(tmp_path):
+    input_path = str(tmp_path / "input.xlsx")
+    body = "\n".join(f"  File \"relay/build.py\", line {n}, in build" for n in range(500))
+    pd.DataFrame({"Title": ["long traceback"], "Body": [body]}).to_excel(input_path, index=False)
+    profile = {"name": "fixture", "system_role": "unused", "build_content": lambda row: row["Body"],
+               "input_file_path": input_path, "output_file_path": str(tmp_path / "output.xlsx")}
+    batch_path = str(tmp_path / "requests.jsonl")
+    export_batch([profile], AsyncEngine(None, "unused"), batch_path, compactor=Compactor(200))
+    with open(batch_path, encoding="utf-8") as f:
+        content = json.loads(f.readline())["body"]["messages"][1]["content"]
+    assert len(content) < len(body) // 10
@@ -0,0 +1,47 @@
+import pytest
+
+from pipeline import probability_end
+from ratelimit import RateLimiter
+from retry import RetryPolicy, is_retryable
+
+
+def test_rate_limited_and_failed_requests_are_retried(mock_server, mock_engine):
+    settings, server = mock_server(rate_limit_rate=0.3, error_rate=0.1, retry_after=0.05)
+    # enough attempts that no row runs out of them, whatever order the requests land in
+    engine = mock_engine(server, cache=False, concurrency=8,
+                         retry_policy=RetryPolicy(max_attempts=20, base_delay=0.01, max_delay=0.05),
+                         rate_limiter=RateLimiter(default_rpm=100000, default_tpm=100000000))
+    outcomes = engine.map([f"report {i}" for i in range(30)])
+    assert all(outcome["error"] is None and outcome["response"] for outcome in outcomes)
+    assert sum(outcome["attempts"] for outcome in outcomes) == settings.requests > 30
+
+
+def test_truncated_answer_is_replayed_without_reask(mock_server, mock_engine):
+    settings, server = mock_server()
+    contents = [f"report {i}" for i in range(5)]
+    options = dict(stream=True, stop_after=0, reask=2, probability_end=probability_end)
+
+    first = mock_engine(server, **options).map(contents)
+    assert all(outcome["stopped_early"] and outcome["reasks"] == 0 for outcome in first)
+    requests = settings.requests
+
+    replayed = mock_engine(server, **options).map(contents)
+    assert settings.requests == requests
+    assert [outcome["response"] for outcome in replayed] == [outcome["response"] for outcome in first]
+    assert all(outcome["cache_hit"] and outcome["stopped_early"] and outcome["reasks"] == 0
+               for outcome in replayed)
+
+
+def test_stream_cut_off_mid_body_is_retried(mock_server, mock_engine):
+    settings, server = mock_server(drop_rate=0.5, seed=3)
+    engine = mock_engine(server, cache=False, stream=True,
+                         retry_policy=RetryPolicy(max_attempts=20, base_delay=0.01, max_delay=0.05))
+    outcomes = engine.map([f"report {i}" for i in range(10)])
+    assert all(outcome["error"] is None and outcome["response"] for outcome in outcomes)
+    assert sum(outcome["attempts"] for outcome in outcomes) == settings.requests > 10
+
+
+def test_transport_errors_are_retryable():
+    httpx = pytest.importorskip("httpx")
+    assert is_retryable(httpx.RemoteProtocolError("peer closed connection"))
+    assert is_retryable(httpx.ReadError("connection reset"))
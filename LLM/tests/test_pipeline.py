@@ -0,0 +1,51 @@
+import pandas as pd
+
+from journal import Journal, journal_path_for
+from pipeline import classify_dataframe_async, make_record
+from retry import RetryPolicy
+
+
+def reports(count):
+    return pd.DataFrame({"Title": [f"[Bug] report {i}" for i in range(count)],
+                         "Body": [f"TVMError: Check failed #{i}" for i in range(count)]})
+
+
+def build_content(row):
+    return f"# - **Title**: {row['Title']}\n# - **Description**: {row['Body']}"
+
+
+def classify(engine, df, output_file_path):
+    return engine.run(classify_dataframe_async(df, build_content, engine, str(output_file_path)))
+
+
+def test_resume_asks_only_unfinished_rows(tmp_path, mock_server, mock_engine):
+    settings, server = mock_server(error_rate=0.5, seed=2)
+    output = tmp_path / "output.xlsx"
+    journal = Journal(journal_path_for(str(output)))
+    journal.append(make_record(0, {"response": "FalsePositive_Probability: 0.9\n\nReasoning: kept"}))
+    journal.append(make_record(1, {"response": "FalsePositive_Probability: 0.9"}))
+    journal.close()
+
+    # no retries: the injected 500s leave rows failed for the next run
+    first = classify(mock_engine(server, cache=False, retry_policy=RetryPolicy(max_attempts=1)), reports(10), output)
+    failed = int(first["Failure_Reason"].notna().sum())
+    assert first.loc[0, "Reasoning"] == "kept"
+    assert settings.requests == 9 and 0 < failed < 9
+
+    settings.error_rate = 0.0
+    second = classify(mock_engine(server, cache=False), reports(10), output)
+    assert settings.requests == 9 + failed
+    assert second["Failure_Reason"].isna().all()
+    assert second.loc[0, "Reasoning"] == "kept"
+
+
+def test_cached_rerun_makes_no_requests(tmp_path, mock_server, mock_engine):
+    settings, server = mock_server()
+    first = classify(mock_engine(server), reports(6), tmp_path / "first.xlsx")
+    requests = settings.requests
+
+    engine = mock_engine(server)
+    second = classify(engine, reports(6), tmp_path / "second.xlsx")
+    assert settings.requests == requests
+    assert engine.cache.stats()["hits"] == 6 and engine.cache.stats()["misses"] == 0
+    assert list(second["FalsePositive_Probability"]) == list(first["FalsePositive_Probability"])
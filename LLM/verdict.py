@@ -0,0 +1,52 @@
+import math
+
+VERDICT_INSTRUCTION = """
+# Do not use the output format above. Answer with exactly one word: `FalsePositive` if the issue is a FalsePositive, `Bug` if it is a genuine bug in the compiler.
+"""
+
+# one output token with its alternatives; the system prompt and examples stay identical, so the
+# verdict request reuses the full request's cached prefix
+VERDICT_REQUEST = {"max_tokens": 1, "logprobs": True, "top_logprobs": 10, "temperature": 0,
+                   "n": None, "response_format": None}
+
+FALSE_POSITIVE_TOKENS = ("false", "fp")
+BUG_TOKENS = ("bug", "genuine", "confirmed")
+
+
+def verdict_probability(top_logprobs):
+    """P(FalsePositive) renormalised over the FalsePositive/Bug verdict tokens among the alternatives.
+
+    Returns None when neither verdict appears (e.g. the model opened with markdown).
+    """
+    false_positive = bug = 0.0
+    for token, logprob in top_logprobs or []:
+        word = token.strip().strip("`*\"'").lower()
+        if not word:
+            continue
+        if word.startswith(FALSE_POSITIVE_TOKENS):
+            false_positive += math.exp(logprob)
+        elif word.startswith(BUG_TOKENS):
+            bug += math.exp(logprob)
+    if false_positive + bug == 0.0:
+        return None
+    return false_positive / (false_positive + bug)
+
+
+class VerdictScorer:
+    """Scores rows from a one-token verdict; rows inside [low, high] also get a full reasoned answer."""
+
+    def __init__(self, low=0.2, high=0.8):
+        self.low = low
+        self.high = high
+
+    @staticmethod
+    def content(content):
+        return content + VERDICT_INSTRUCTION
+
+    def escalate(self, probability):
+        return probability is None or self.low <= probability <= self.high
+
+    @staticmethod
+    def verdict_response(probability):
+        return (f"FalsePositive_Probability: {probability:.4f}\n\n"
+                f"Reasoning: Scored from the log-probabilities of a one-token verdict without a written explanation.")